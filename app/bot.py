@@ -15,17 +15,22 @@ import inspect
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import CodeType
 from typing import Any
 
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of bot executions in flight at once
+MAX_CONCURRENT_BOTS = 100
+
 # Limit concurrent bot executions to prevent resource exhaustion
-_bot_semaphore = asyncio.Semaphore(100)
+_bot_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BOTS)
 
 # Dedicated thread pool for bot execution (separate from default executor)
-_bot_executor = ThreadPoolExecutor(max_workers=100, thread_name_prefix="bot_")
+_bot_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BOTS, thread_name_prefix="bot_")
 
 # Timeout for bot code execution (seconds)
 BOT_EXECUTION_TIMEOUT = 10
@@ -39,6 +44,17 @@ _bot_send_lock = asyncio.Lock()
 _last_bot_send_time: float = 0.0
 
 
+@lru_cache(maxsize=32)
+def compile_bot_code(code: str) -> CodeType:
+    """Compile bot source, reusing the code object while the source is unchanged.
+
+    The same configured code runs for every incoming message, so only the first
+    call pays for parsing. Settings validation compiles through here too, which
+    leaves saved bot code already compiled. Errors propagate and are not cached.
+    """
+    return compile(code, "<string>", "exec")
+
+
 def execute_bot_code(
     code: str,
     sender_name: str | None,
@@ -79,7 +95,7 @@ def execute_bot_code(
 
     Note: This executes arbitrary code. Only use with trusted input.
     """
-    if not code or not code.strip():
+    if not code or code.isspace():
         return None
 
     # Build execution namespace with allowed imports
@@ -89,7 +105,7 @@ def execute_bot_code(
 
     try:
         # Execute the user's code to define the bot function
-        exec(code, namespace)
+        exec(compile_bot_code(code), namespace)
     except Exception as e:
         logger.warning("Bot code compilation failed: %s", e)
         return None
@@ -162,11 +178,15 @@ def execute_bot_code(
         # Validate result
         if result is None:
             return None
+        # isspace() rejects blank text without allocating a stripped copy;
+        # it is False for "", so emptiness is checked separately.
         if isinstance(result, str):
-            return result if result.strip() else None
+            return result if result and not result.isspace() else None
         if isinstance(result, list):
             # Filter to non-empty strings only
-            valid_messages = [msg for msg in result if isinstance(msg, str) and msg.strip()]
+            valid_messages = [
+                msg for msg in result if isinstance(msg, str) and msg and not msg.isspace()
+            ]
             return valid_messages if valid_messages else None
 
         logger.debug("Bot function returned unsupported type: %s", type(result))
@@ -1,4 +1,7 @@
 import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 
 import aiosqlite
@@ -54,14 +57,17 @@ CREATE TABLE IF NOT EXISTS raw_packets (
     timestamp INTEGER NOT NULL,
     data BLOB NOT NULL,
     message_id INTEGER,
-    payload_hash TEXT,
+    payload_hash BLOB,
     FOREIGN KEY (message_id) REFERENCES messages(id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(type, conversation_key);
+CREATE INDEX IF NOT EXISTS idx_messages_unread
+    ON messages(type, conversation_key, outgoing, received_at);
 CREATE INDEX IF NOT EXISTS idx_messages_received ON messages(received_at);
 CREATE INDEX IF NOT EXISTS idx_raw_packets_message_id ON raw_packets(message_id);
 CREATE UNIQUE INDEX IF NOT EXISTS idx_raw_packets_payload_hash ON raw_packets(payload_hash);
+CREATE INDEX IF NOT EXISTS idx_raw_packets_undecrypted
+    ON raw_packets(timestamp) WHERE message_id IS NULL;
 CREATE INDEX IF NOT EXISTS idx_contacts_on_radio ON contacts(on_radio);
 """
 
@@ -70,12 +76,36 @@ class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self._connection: aiosqlite.Connection | None = None
+        # Connection that this instance's conn hands out in the current context
+        # instead of its own. Context-local so concurrent tests can each run
+        # against their own database; per instance so other Databases (such as
+        # a test template being cloned) are never redirected.
+        self._connection_override: ContextVar[aiosqlite.Connection | None] = ContextVar(
+            f"db_connection_override_{id(self)}", default=None
+        )
 
     async def connect(self) -> None:
         logger.info("Connecting to database at %s", self.db_path)
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        self._connection = await aiosqlite.connect(self.db_path)
+        # sqlite3 keeps compiled statements in a per-connection LRU keyed by SQL text.
+        # The default of 128 is close to the number of distinct queries the app issues
+        # (plus dynamically built filters), so leave headroom to avoid re-preparing
+        # hot statements such as the raw packet insert.
+        self._connection = await aiosqlite.connect(self.db_path, cached_statements=256)
+        # Rows support both name and position access. Loops over whole result sets
+        # unpack rows positionally, which skips a column-name lookup per field.
         self._connection.row_factory = aiosqlite.Row
+        # The journal and mmap settings below only mean something for a database
+        # file; an in-memory database (as the tests use) has neither.
+        if self.db_path != ":memory:":
+            # Every received packet is its own committed write. In WAL mode with
+            # synchronous=NORMAL a commit appends to the log without an fsync; syncing
+            # happens once per checkpoint instead of once per packet.
+            await self._connection.execute("PRAGMA journal_mode=WAL")
+            await self._connection.execute("PRAGMA synchronous=NORMAL")
+            # Read pages (notably the payload_hash dedup index probed on every packet)
+            # straight from a memory map instead of copying them through read() calls.
+            await self._connection.execute("PRAGMA mmap_size=268435456")
         await self._connection.executescript(SCHEMA)
         await self._connection.commit()
         logger.debug("Database schema initialized")
@@ -93,9 +123,21 @@ class Database:
 
     @property
     def conn(self) -> aiosqlite.Connection:
+        override = self._connection_override.get()
+        if override is not None:
+            return override
         if not self._connection:
             raise RuntimeError("Database not connected")
         return self._connection
 
+    @contextmanager
+    def override_connection(self, conn: aiosqlite.Connection) -> Iterator[None]:
+        """Route this instance's conn lookups in the current context to `conn`."""
+        token = self._connection_override.set(conn)
+        try:
+            yield
+        finally:
+            self._connection_override.reset(token)
+
 
 db = Database(settings.database_path)
@@ -9,7 +9,7 @@ so all migrations run in order on first startup after upgrade.
 """
 
 import logging
-from hashlib import sha256
+from hashlib import blake2b, sha256
 
 import aiosqlite
 
@@ -156,6 +156,27 @@ async def run_migrations(conn: aiosqlite.Connection) -> int:
         await set_version(conn, 17)
         applied += 1
 
+    # Migration 18: Store payload_hash as a 16-byte BLAKE2b BLOB instead of SHA-256 hex
+    if version < 18:
+        logger.info("Applying migration 18: rehash payload_hash as 16-byte BLAKE2b")
+        await _migrate_018_payload_hash_to_blake2b_blob(conn)
+        await set_version(conn, 18)
+        applied += 1
+
+    # Migration 19: Replace the (type, conversation_key) index with one covering unread counts
+    if version < 19:
+        logger.info("Applying migration 19: add covering index for unread counts")
+        await _migrate_019_add_unread_covering_index(conn)
+        await set_version(conn, 19)
+        applied += 1
+
+    # Migration 20: Partial index over undecrypted raw packets by timestamp
+    if version < 20:
+        logger.info("Applying migration 20: add partial index for undecrypted packets")
+        await _migrate_020_add_undecrypted_packets_index(conn)
+        await set_version(conn, 20)
+        applied += 1
+
     if applied > 0:
         logger.info(
             "Applied %d migration(s), schema now at version %d", applied, await get_version(conn)
@@ -1054,3 +1075,114 @@ async def _migrate_017_drop_experimental_channel_double_send(conn: aiosqlite.Con
             raise
 
     await conn.commit()
+
+
+async def _migrate_018_payload_hash_to_blake2b_blob(conn: aiosqlite.Connection) -> None:
+    """
+    Recompute payload_hash as a raw 16-byte BLAKE2b digest.
+
+    The unique dedup index was keyed on 64-character SHA-256 hex strings; a 16-byte
+    BLOB is a quarter of the key size and compares with a plain memcmp.
+    Existing databases keep the column's declared TEXT type, which stores BLOB
+    values unchanged. Old hex values can never equal new BLOBs, and distinct
+    payloads already had distinct hashes, so the unique index holds throughout.
+    """
+    cursor = await conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='raw_packets'"
+    )
+    if not await cursor.fetchone():
+        logger.debug("raw_packets table does not exist yet, skipping payload_hash rehash")
+        return
+
+    cursor = await conn.execute(
+        "SELECT COUNT(*) FROM raw_packets WHERE typeof(payload_hash) = 'text'"
+    )
+    row = await cursor.fetchone()
+    total = row[0] if row else 0
+
+    if total == 0:
+        logger.debug("No packets need payload_hash rehash")
+        return
+
+    logger.info("Rehashing payload_hash for %d packets...", total)
+
+    batch_size = 1000
+    last_id = 0
+    processed = 0
+    while True:
+        cursor = await conn.execute(
+            "SELECT id, data FROM raw_packets "
+            "WHERE id > ? AND typeof(payload_hash) = 'text' ORDER BY id ASC LIMIT ?",
+            (last_id, batch_size),
+        )
+        rows = await cursor.fetchall()
+        if not rows:
+            break
+
+        updates: list[tuple[bytes, int]] = []
+        for packet_id, packet_data in rows:
+            packet_data = bytes(packet_data)
+            payload = _extract_payload_for_hash(packet_data)
+            if payload:
+                payload_hash = blake2b(payload, digest_size=16).digest()
+            else:
+                # For malformed packets, hash the full data
+                payload_hash = blake2b(packet_data, digest_size=16).digest()
+            updates.append((payload_hash, packet_id))
+
+        await conn.executemany("UPDATE raw_packets SET payload_hash = ? WHERE id = ?", updates)
+        last_id = rows[-1][0]
+        processed += len(rows)
+        if processed % 10000 < batch_size:
+            logger.info("Rehashed %d/%d packets...", processed, total)
+
+    await conn.commit()
+    logger.info("payload_hash rehash complete: %d packets updated", processed)
+
+
+async def _migrate_019_add_unread_covering_index(conn: aiosqlite.Connection) -> None:
+    """
+    Index messages on (type, conversation_key, outgoing, received_at).
+
+    The unread-count queries filter each conversation on outgoing and a received_at
+    range, and the last-message-time query takes MAX(received_at) per conversation.
+    With all four columns in the index those become index range scans instead of
+    reading every message row. The old (type, conversation_key) index is a prefix
+    of the new one, so it is dropped rather than maintained on every insert.
+    """
+    cursor = await conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='messages'"
+    )
+    if not await cursor.fetchone():
+        logger.debug("messages table does not exist yet, skipping unread index")
+        return
+
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_unread "
+        "ON messages(type, conversation_key, outgoing, received_at)"
+    )
+    await conn.execute("DROP INDEX IF EXISTS idx_messages_conversation")
+    await conn.commit()
+
+
+async def _migrate_020_add_undecrypted_packets_index(conn: aiosqlite.Connection) -> None:
+    """
+    Index raw_packets(timestamp) for rows with message_id IS NULL.
+
+    Pruning, the oldest-undecrypted health check and the historical decrypt passes
+    all filter on message_id IS NULL and order or range on timestamp. Decrypted
+    packets are the bulk of the table, so a partial index keeps those queries
+    proportional to the undecrypted backlog rather than the whole table.
+    """
+    cursor = await conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='raw_packets'"
+    )
+    if not await cursor.fetchone():
+        logger.debug("raw_packets table does not exist yet, skipping undecrypted index")
+        return
+
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_raw_packets_undecrypted "
+        "ON raw_packets(timestamp) WHERE message_id IS NULL"
+    )
+    await conn.commit()
@@ -1,8 +1,7 @@
 import json
 import logging
-import sqlite3
 import time
-from hashlib import sha256
+from hashlib import blake2b
 from typing import Any, Literal
 
 from app.database import db
@@ -220,10 +219,15 @@ class ContactRepository:
         return cursor.rowcount > 0
 
     @staticmethod
-    async def mark_all_read(timestamp: int) -> None:
-        """Mark all contacts as read at the given timestamp."""
+    async def mark_all_read(timestamp: int, commit: bool = True) -> None:
+        """Mark all contacts as read at the given timestamp.
+
+        Pass commit=False to leave the write in the open transaction so the
+        caller can commit it together with other updates.
+        """
         await db.conn.execute("UPDATE contacts SET last_read_at = ?", (timestamp,))
-        await db.conn.commit()
+        if commit:
+            await db.conn.commit()
 
     @staticmethod
     async def get_by_pubkey_first_byte(hex_byte: str) -> list[Contact]:
@@ -312,10 +316,15 @@ class ChannelRepository:
         return cursor.rowcount > 0
 
     @staticmethod
-    async def mark_all_read(timestamp: int) -> None:
-        """Mark all channels as read at the given timestamp."""
+    async def mark_all_read(timestamp: int, commit: bool = True) -> None:
+        """Mark all channels as read at the given timestamp.
+
+        Pass commit=False to leave the write in the open transaction so the
+        caller can commit it together with other updates.
+        """
         await db.conn.execute("UPDATE channels SET last_read_at = ?", (timestamp,))
-        await db.conn.commit()
+        if commit:
+            await db.conn.commit()
 
 
 class MessageRepository:
@@ -614,52 +623,37 @@ class MessageRepository:
 
         mention_token = f"@[{name}]" if name else None
 
-        # Channel unreads
+        # Unread counts and mention flags for channels and contacts in one pass.
+        # LOWER(:mention) is constant, so SQLite evaluates it once per statement.
         cursor = await db.conn.execute(
             """
-            SELECT m.conversation_key,
-                   COUNT(*) as unread_count,
-                   MAX(m.received_at) as last_message_time,
-                   SUM(CASE
-                           WHEN ? <> '' AND INSTR(LOWER(m.text), LOWER(?)) > 0 THEN 1
-                           ELSE 0
-                       END) > 0 as has_mention
+            SELECT 'channel' AS prefix,
+                   m.conversation_key,
+                   COUNT(*) AS unread_count,
+                   MAX(:mention <> '' AND INSTR(LOWER(m.text), LOWER(:mention)) > 0)
+                       AS has_mention
             FROM messages m
             JOIN channels c ON m.conversation_key = c.key
             WHERE m.type = 'CHAN' AND m.outgoing = 0
               AND m.received_at > COALESCE(c.last_read_at, 0)
             GROUP BY m.conversation_key
-            """,
-            (mention_token or "", mention_token or ""),
-        )
-        rows = await cursor.fetchall()
-        for row in rows:
-            state_key = f"channel-{row['conversation_key']}"
-            counts[state_key] = row["unread_count"]
-            if mention_token and row["has_mention"]:
-                mention_flags[state_key] = True
-
-        # Contact unreads
-        cursor = await db.conn.execute(
-            """
-            SELECT m.conversation_key,
-                   COUNT(*) as unread_count,
-                   MAX(m.received_at) as last_message_time,
-                   SUM(CASE
-                           WHEN ? <> '' AND INSTR(LOWER(m.text), LOWER(?)) > 0 THEN 1
-                           ELSE 0
-                       END) > 0 as has_mention
+            UNION ALL
+            SELECT 'contact' AS prefix,
+                   m.conversation_key,
+                   COUNT(*) AS unread_count,
+                   MAX(:mention <> '' AND INSTR(LOWER(m.text), LOWER(:mention)) > 0)
+                       AS has_mention
             FROM messages m
             JOIN contacts ct ON m.conversation_key = ct.public_key
             WHERE m.type = 'PRIV' AND m.outgoing = 0
               AND m.received_at > COALESCE(ct.last_read_at, 0)
             GROUP BY m.conversation_key
             """,
-            (mention_token or "", mention_token or ""),
+            {"mention": mention_token or ""},
         )
         rows = await cursor.fetchall()
         for row in rows:
-            state_key = f"contact-{row['conversation_key']}"
+            state_key = f"{row['prefix']}-{row['conversation_key']}"
             counts[state_key] = row["unread_count"]
             if mention_token and row["has_mention"]:
                 mention_flags[state_key] = True
@@ -695,7 +689,7 @@ class RawPacketRepository:
         - is_new=True: New packet stored, packet_id is the new row ID
         - is_new=False: Duplicate payload detected, packet_id is the existing row ID
 
-        Deduplication is based on the SHA-256 hash of the packet payload
+        Deduplication is based on a 16-byte BLAKE2b digest of the packet payload
         (excluding routing/path information).
         """
         ts = timestamp if timestamp is not None else int(time.time())
@@ -703,51 +697,36 @@ class RawPacketRepository:
         # Compute payload hash for deduplication
         payload = extract_payload(data)
         if payload:
-            payload_hash = sha256(payload).hexdigest()
+            payload_hash = blake2b(payload, digest_size=16).digest()
         else:
             # For malformed packets, hash the full data
-            payload_hash = sha256(data).hexdigest()
+            payload_hash = blake2b(data, digest_size=16).digest()
 
-        # Check if this payload already exists
+        # Insert unless the payload is already stored. The unique index on payload_hash
+        # turns the existence check and the insert into one statement; only duplicates
+        # need a second round trip to look up the existing row.
         cursor = await db.conn.execute(
-            "SELECT id FROM raw_packets WHERE payload_hash = ?", (payload_hash,)
+            "INSERT INTO raw_packets (timestamp, data, payload_hash) VALUES (?, ?, ?) "
+            "ON CONFLICT(payload_hash) DO NOTHING",
+            (ts, data, payload_hash),
         )
-        existing = await cursor.fetchone()
-
-        if existing:
-            # Duplicate - return existing packet ID
-            logger.debug(
-                "Duplicate payload detected (hash=%s..., existing_id=%d)",
-                payload_hash[:12],
-                existing["id"],
-            )
-            return (existing["id"], False)
-
-        # New packet - insert with hash
-        try:
-            cursor = await db.conn.execute(
-                "INSERT INTO raw_packets (timestamp, data, payload_hash) VALUES (?, ?, ?)",
-                (ts, data, payload_hash),
-            )
-            await db.conn.commit()
+        await db.conn.commit()
+        if cursor.rowcount > 0:
             assert cursor.lastrowid is not None  # INSERT always returns a row ID
             return (cursor.lastrowid, True)
-        except sqlite3.IntegrityError:
-            # Race condition: another insert with same payload_hash happened between
-            # our SELECT and INSERT. This is expected for duplicate packets arriving
-            # close together. Query again to get the existing ID.
-            logger.debug(
-                "Duplicate packet detected via race condition (payload_hash=%s), dropping",
-                payload_hash[:16],
-            )
-            cursor = await db.conn.execute(
-                "SELECT id FROM raw_packets WHERE payload_hash = ?", (payload_hash,)
-            )
-            existing = await cursor.fetchone()
-            if existing:
-                return (existing["id"], False)
-            # This shouldn't happen, but if it does, re-raise
-            raise
+
+        # Duplicate - return existing packet ID
+        cursor = await db.conn.execute(
+            "SELECT id FROM raw_packets WHERE payload_hash = ?", (payload_hash,)
+        )
+        existing = await cursor.fetchone()
+        assert existing is not None  # the conflicting row is still there
+        logger.debug(
+            "Duplicate payload detected (hash=%s..., existing_id=%d)",
+            payload_hash.hex()[:12],
+            existing["id"],
+        )
+        return (existing["id"], False)
 
     @staticmethod
     async def get_undecrypted_count() -> int:
@@ -774,7 +753,7 @@ class RawPacketRepository:
             "SELECT id, data, timestamp FROM raw_packets WHERE message_id IS NULL ORDER BY timestamp ASC"
         )
         rows = await cursor.fetchall()
-        return [(row["id"], bytes(row["data"]), row["timestamp"]) for row in rows]
+        return [(packet_id, bytes(data), timestamp) for packet_id, data, timestamp in rows]
 
     @staticmethod
     async def mark_decrypted(packet_id: int, message_id: int) -> None:
@@ -810,11 +789,11 @@ class RawPacketRepository:
 
         # Filter for TEXT_MESSAGE packets
         result = []
-        for row in rows:
-            data = bytes(row["data"])
+        for packet_id, raw, timestamp in rows:
+            data = bytes(raw)
             payload_type = get_packet_payload_type(data)
             if payload_type == PayloadType.TEXT_MESSAGE:
-                result.append((row["id"], data, row["timestamp"]))
+                result.append((packet_id, data, timestamp))
 
         return result
 
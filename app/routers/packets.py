@@ -252,7 +252,8 @@ async def run_maintenance(request: MaintenanceRequest) -> MaintenanceResult:
     Clean up old undecrypted packets and reclaim disk space.
 
     - Deletes undecrypted packets older than the specified number of days
-    - Runs VACUUM to reclaim disk space
+    - Runs VACUUM to reclaim disk space, unless nothing was deleted and the
+      database has no free pages (a rebuild would rewrite the file for nothing)
     """
     logger.info(
         "Running maintenance: pruning packets older than %d days", request.prune_undecrypted_days
@@ -264,7 +265,15 @@ async def run_maintenance(request: MaintenanceRequest) -> MaintenanceResult:
 
     # Run VACUUM to reclaim space on a dedicated connection
     async with aiosqlite.connect(db.db_path) as vacuum_conn:
-        await vacuum_conn.executescript("VACUUM;")
-    logger.info("Database vacuumed")
-
-    return MaintenanceResult(packets_deleted=deleted, vacuumed=True)
+        cursor = await vacuum_conn.execute("PRAGMA freelist_count")
+        row = await cursor.fetchone()
+        free_pages = row[0] if row else 0
+        vacuumed = deleted > 0 or free_pages > 0
+        if vacuumed:
+            await vacuum_conn.executescript("VACUUM;")
+    if vacuumed:
+        logger.info("Database vacuumed")
+    else:
+        logger.info("Nothing to reclaim, skipped VACUUM")
+
+    return MaintenanceResult(packets_deleted=deleted, vacuumed=vacuumed)
@@ -5,6 +5,7 @@ import time
 
 from fastapi import APIRouter
 
+from app.database import db
 from app.models import UnreadCounts
 from app.radio import radio_manager
 from app.repository import ChannelRepository, ContactRepository, MessageRepository
@@ -39,8 +40,9 @@ async def mark_all_read() -> dict:
     """
     now = int(time.time())
 
-    await ContactRepository.mark_all_read(now)
-    await ChannelRepository.mark_all_read(now)
+    await ContactRepository.mark_all_read(now, commit=False)
+    await ChannelRepository.mark_all_read(now, commit=False)
+    await db.conn.commit()
 
     logger.info("Marked all contacts and channels as read at %d", now)
     return {"status": "ok", "timestamp": now}
@@ -4,6 +4,7 @@ from typing import Literal
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
+from app.bot import compile_bot_code
 from app.models import AppSettings, BotConfig
 from app.repository import AppSettingsRepository
 
@@ -13,11 +14,11 @@ router = APIRouter(prefix="/settings", tags=["settings"])
 
 def validate_bot_code(code: str, bot_name: str | None = None) -> None:
     """Validate bot code syntax. Raises HTTPException on error."""
-    if not code or not code.strip():
+    if not code or code.isspace():
         return  # Empty code is valid (disables bot)
 
     try:
-        compile(code, "<bot_code>", "exec")
+        compile_bot_code(code)
     except SyntaxError as e:
         name_part = f"'{bot_name}' " if bot_name else ""
         raise HTTPException(
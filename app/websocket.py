@@ -98,6 +98,10 @@ def broadcast_event(event_type: str, data: dict) -> None:
     Convenience function that creates an asyncio task to broadcast
     an event to all connected WebSocket clients.
     """
+    # Most events (raw packets especially) arrive while no browser is open;
+    # don't spin up a task just for broadcast() to find nobody to send to.
+    if not ws_manager.active_connections:
+        return
     asyncio.create_task(ws_manager.broadcast(event_type, data))
 
 
@@ -1,9 +1,11 @@
 """Pytest configuration and shared fixtures."""
 
+import functools
 import os
 import shutil
 import tempfile
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
@@ -22,6 +24,103 @@ def cleanup_test_db_dir():
     shutil.rmtree(_TEST_DB_DIR, ignore_errors=True)
 
 
+@pytest.fixture(scope="session")
+async def _template_db():
+    """Build one in-memory database with schema + migrations for the whole session."""
+    from app.database import Database
+
+    template = Database(":memory:")
+    await template.connect()
+    yield template
+    await template.disconnect()
+
+
+# Test databases are throwaway: skip durability work and keep scratch data in RAM.
+# An in-memory database already journals to memory; the rest matters for sorts,
+# temp b-trees, and keeping indexes resident across a test's queries.
+_TEST_PRAGMAS = """
+PRAGMA journal_mode=MEMORY;
+PRAGMA synchronous=OFF;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+"""
+
+
+async def _open_clone(template):
+    """Open a new in-memory Database holding a copy of the template's contents."""
+    import aiosqlite
+
+    from app.database import Database
+
+    conn = await aiosqlite.connect(":memory:")
+    conn.row_factory = aiosqlite.Row
+    await conn.executescript(_TEST_PRAGMAS)
+    await template.conn.backup(conn)
+
+    db = Database(":memory:")
+    db._connection = conn
+    return db
+
+
+@pytest.fixture(scope="session")
+def clone_template_db(_template_db):
+    """Coroutine function returning a fresh, connected clone of the session template."""
+    return functools.partial(_open_clone, _template_db)
+
+
+@pytest.fixture
+async def fresh_db(clone_template_db):
+    """A connected in-memory Database cloned from the session template.
+
+    Copying the template's pages with SQLite's backup API is much cheaper than
+    re-running the schema and every migration for each test.
+    """
+    db = await clone_template_db()
+    try:
+        yield db
+    finally:
+        await db.disconnect()
+
+
+@pytest.fixture
+async def test_db(fresh_db):
+    """A fresh_db clone that app.database.db (and so every repository) reads and writes."""
+    from app.database import db
+
+    with db.override_connection(fresh_db.conn):
+        yield fresh_db
+
+
+@pytest.fixture(scope="session")
+def capture_task():
+    """Stand-in for asyncio.create_task that closes the coroutine instead of running it.
+
+    Closing keeps Python from warning that it was never awaited. The callers
+    discard the Task they get back, so one inert placeholder serves them all.
+    """
+    placeholder = SimpleNamespace(cancel=lambda: None, done=lambda: True)
+
+    def capture(coro):
+        coro.close()
+        return placeholder
+
+    return capture
+
+
+@pytest.fixture(scope="session")
+def sync_client():
+    """One TestClient over the app for every synchronous HTTP and WebSocket test.
+
+    Not entered as a context manager, so the app lifespan (database and radio
+    connect) never runs; tests patch what the endpoints touch instead.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
+
+
 @pytest.fixture
 def sample_channel_key():
     """A sample 16-byte channel key for testing."""
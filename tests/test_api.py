@@ -4,334 +4,372 @@ These tests verify the REST API behavior for critical operations.
 Uses httpx.AsyncClient or direct function calls with real in-memory SQLite.
 """
 
-import hashlib
 import time
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 import httpx
 import pytest
+from fastapi import HTTPException
+from meshcore import EventType
 
-from app.database import Database
+from app.database import Database, db
+from app.main import app
+from app.models import SendChannelMessageRequest, SendDirectMessageRequest
 from app.repository import (
     ChannelRepository,
     ContactRepository,
     MessageRepository,
     RawPacketRepository,
 )
+from app.routers.channels import CreateChannelRequest, create_channel
+from app.routers.messages import send_channel_message, send_direct_message
+from app.routers.packets import MaintenanceRequest, get_undecrypted_count, run_maintenance
+from app.routers.read_state import mark_all_read
+
+# Tables cleared between tests, in one transaction. The schema + migrations are applied
+# once per module; per-test SAVEPOINT rollback is not an option because repository
+# methods commit.
+_RESET_SQL = """
+BEGIN;
+DELETE FROM raw_packets;
+DELETE FROM messages;
+DELETE FROM contacts;
+DELETE FROM channels;
+COMMIT;
+"""
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database with schema + migrations."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
+@pytest.fixture(scope="module")
+async def _module_db(clone_template_db):
+    """Clone one migrated in-memory database for this module."""
+    module_db = await clone_template_db()
+    yield module_db
+    await module_db.disconnect()
 
-    original_db = repo_module.db
-    repo_module.db = db
 
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
+@pytest.fixture
+async def test_db(_module_db):
+    """Point the repositories at the module database and empty it after each test."""
+    with db.override_connection(_module_db.conn):
+        yield _module_db
+    await _module_db.conn.executescript(_RESET_SQL)
 
 
-@pytest.fixture
-def client():
-    """Create an httpx AsyncClient for testing the app."""
-    from app.main import app
+@pytest.fixture(scope="module")
+async def client():
+    """Share one httpx AsyncClient over the ASGI app per module.
 
+    ASGITransport holds no sockets or per-request state, so reuse across tests is safe.
+    """
     transport = httpx.ASGITransport(app=app)
-    return httpx.AsyncClient(transport=transport, base_url="http://test")
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
 
 
-async def _insert_contact(public_key, name="Alice", **overrides):
-    """Insert a contact into the test database."""
-    data = {
-        "public_key": public_key,
-        "name": name,
-        "type": 0,
-        "flags": 0,
-        "last_path": None,
-        "last_path_len": -1,
-        "last_advert": None,
-        "lat": None,
-        "lon": None,
-        "last_seen": None,
-        "on_radio": False,
-        "last_contacted": None,
-    }
-    data.update(overrides)
-    await ContactRepository.upsert(data)
+# First 16 bytes of sha256(b"#mychannel"), upper-case hex: the derived hashtag channel key.
+_MYCHANNEL_KEY = "B3E432002FE1CFF40299F9D7DF79493B"
 
+# Wall clock pinned by the read-state tests, so stored timestamps can be compared exactly.
+_FROZEN_NOW = 1_700_000_000.5
 
-class TestHealthEndpoint:
-    """Test the health check endpoint."""
+# Well-formed keys in their stored case: 32-byte contact keys lower-case, 16-byte
+# channel keys upper-case.
+_PUB_KEY_A = "a" * 64
+_PUB_KEY_AB = "ab" * 32
+_CONTACT_KEY_ABCD = "abcd" * 16
+_CHAN_KEY_AA = "AA" * 16
 
-    def test_health_returns_connection_status(self):
-        """Health endpoint returns radio connection status."""
-        from fastapi.testclient import TestClient
+# Request bodies for the router-direct tests; the fields are known-valid, so skip validation.
+_DM_REQUEST = SendDirectMessageRequest.model_construct(destination=_PUB_KEY_A, text="Hello")
+_CHANNEL_REQUEST = SendChannelMessageRequest.model_construct(
+    channel_key="0123456789ABCDEF0123456789ABCDEF", text="Hello"
+)
 
-        with patch("app.routers.health.radio_manager") as mock_rm:
-            mock_rm.is_connected = True
-            mock_rm.connection_info = "Serial: /dev/ttyUSB0"
+# Radio command results are only read by the routers, so one instance can be shared.
+_OK_RESULT = SimpleNamespace(type=EventType.OK, payload={})
+_SENT_RESULT = SimpleNamespace(type=EventType.MSG_SENT, payload={})
+
+
+async def _none_async(*args, **kwargs):
+    """Plain async stub returning None, for patches nothing asserts against."""
+    return None
+
+
+def _build_meshcore_mock(contact=None) -> SimpleNamespace:
+    """Build a MeshCore stand-in whose contact/channel send commands all succeed.
+
+    Plain namespaces avoid MagicMock's child-mock machinery; only the awaited
+    commands are AsyncMocks. `contact` is what a key-prefix lookup returns.
+    """
+    return SimpleNamespace(
+        self_info={"name": "TestNode"},
+        get_contact_by_key_prefix=lambda _prefix: contact,
+        commands=SimpleNamespace(
+            add_contact=AsyncMock(return_value=_OK_RESULT),
+            send_msg=AsyncMock(return_value=_OK_RESULT),
+            send_chan_msg=AsyncMock(return_value=_OK_RESULT),
+            set_channel=AsyncMock(return_value=_OK_RESULT),
+        ),
+    )
+
+
+def _channel_meshcore(set_channel_result=None, send_result=None) -> SimpleNamespace:
+    """Build a MeshCore stand-in with only what a channel send touches."""
+    return SimpleNamespace(
+        self_info={"name": "TestNode"},
+        commands=SimpleNamespace(
+            set_channel=AsyncMock(return_value=set_channel_result),
+            send_chan_msg=AsyncMock(return_value=send_result),
+        ),
+    )
+
+
+# Column defaults for _insert_contact; never mutated, callers build a new dict from it.
+_CONTACT_DEFAULTS = {
+    "type": 0,
+    "flags": 0,
+    "last_path": None,
+    "last_path_len": -1,
+    "last_advert": None,
+    "lat": None,
+    "lon": None,
+    "last_seen": None,
+    "on_radio": False,
+    "last_contacted": None,
+}
 
-            from app.main import app
 
-            client = TestClient(app)
+async def _insert_contact(public_key, name="Alice", **overrides):
+    """Insert a contact into the test database."""
+    await ContactRepository.upsert(
+        {**_CONTACT_DEFAULTS, "public_key": public_key, "name": name, **overrides}
+    )
+
+
+async def _seed_conversations(conn, contacts=(), channels=()):
+    """Insert contact and channel rows in one transaction.
+
+    Rows are (key, name, last_read_at) tuples; pass None for a conversation
+    that has never been read. Bypasses the repositories, so keys must already
+    be in their stored case (lower-case contact keys, upper-case channel keys).
+    """
+    await conn.executemany(
+        "INSERT INTO contacts (public_key, name, last_read_at) VALUES (?, ?, ?)",
+        contacts,
+    )
+    await conn.executemany(
+        "INSERT INTO channels (key, name, last_read_at) VALUES (?, ?, ?)",
+        channels,
+    )
+    await conn.commit()
+
+
+# Reusing one exact statement text lets SQLite serve it from the statement cache.
+_INSERT_MSG_SQL = (
+    "INSERT INTO messages (type, conversation_key, text, sender_timestamp, received_at, outgoing) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
 
-            response = client.get("/api/health")
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["radio_connected"] is True
-            assert data["connection_info"] == "Serial: /dev/ttyUSB0"
+async def _insert_messages(conn, *rows):
+    """Insert raw (type, key, text, sender_ts, received_at, outgoing) message rows."""
+    await conn.executemany(_INSERT_MSG_SQL, rows)
+    await conn.commit()
 
-    def test_health_disconnected_state(self):
-        """Health endpoint reflects disconnected radio."""
-        from fastapi.testclient import TestClient
 
-        with patch("app.routers.health.radio_manager") as mock_rm:
-            mock_rm.is_connected = False
-            mock_rm.connection_info = None
+_INSERT_PACKET_SQL = "INSERT INTO raw_packets (timestamp, data, message_id) VALUES (?, ?, ?)"
 
-            from app.main import app
+# Arbitrary raw packet bodies shared by the packet storage and pruning tests.
+_PKT_SHORT = b"\x01\x02\x03"
+_PKT_ALT = b"\x04\x05\x06"
+_PKT_DEC = b"\x07\x08\x09"
+_PKT_FIVE = b"\x01\x02\x03\x04\x05"
 
-            client = TestClient(app)
 
-            response = client.get("/api/health")
+async def _seed_packets(conn, *rows):
+    """Insert raw (timestamp, data, message_id) packet rows in one transaction.
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["radio_connected"] is False
-            assert data["connection_info"] is None
+    Bypasses RawPacketRepository.create, so rows get no payload_hash; only use
+    this where deduplication is not under test.
+    """
+    await conn.executemany(_INSERT_PACKET_SQL, rows)
+    await conn.commit()
 
 
-class TestMessagesEndpoint:
-    """Test message-related endpoints."""
+class TestHealthEndpoint:
+    """Test the health check endpoint."""
 
-    @pytest.mark.asyncio
-    async def test_send_direct_message_requires_connection(self, test_db, client):
-        """Sending message when disconnected returns 503."""
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = False
-            mock_rm.meshcore = None
+    def test_health_returns_connection_status(self, sync_client, mocker):
+        """Health endpoint returns radio connection status."""
+        mocker.patch(
+            "app.routers.health.radio_manager",
+            SimpleNamespace(is_connected=True, connection_info="Serial: /dev/ttyUSB0"),
+        )
 
-            response = await client.post(
-                "/api/messages/direct", json={"destination": "abc123", "text": "Hello"}
-            )
+        response = sync_client.get("/api/health")
 
-            assert response.status_code == 503
-            assert "not connected" in response.json()["detail"].lower()
+        assert response.status_code == 200
+        data = response.json()
+        assert data["radio_connected"] is True
+        assert data["connection_info"] == "Serial: /dev/ttyUSB0"
 
-    @pytest.mark.asyncio
-    async def test_send_channel_message_requires_connection(self, test_db, client):
-        """Sending channel message when disconnected returns 503."""
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = False
-            mock_rm.meshcore = None
+    def test_health_disconnected_state(self, sync_client, mocker):
+        """Health endpoint reflects disconnected radio."""
+        mocker.patch(
+            "app.routers.health.radio_manager",
+            SimpleNamespace(is_connected=False, connection_info=None),
+        )
 
-            response = await client.post(
-                "/api/messages/channel",
-                json={"channel_key": "0123456789ABCDEF0123456789ABCDEF", "text": "Hello"},
-            )
+        response = sync_client.get("/api/health")
 
-            assert response.status_code == 503
+        assert response.status_code == 200
+        data = response.json()
+        assert data["radio_connected"] is False
+        assert data["connection_info"] is None
 
-    @pytest.mark.asyncio
-    async def test_send_direct_message_emits_websocket_message_event(self, test_db, client):
-        """POST /messages/direct should emit a WS message event for other clients."""
-        from meshcore import EventType
 
-        pub_key = "ab" * 32
+@pytest.mark.asyncio(loop_scope="module")
+class TestMessagesEndpoint:
+    """Test message-related endpoints."""
+
+    @pytest.fixture
+    def radio(self, mocker):
+        """Patch the radio manager seen by require_connected() as connected."""
+        mock_rm = mocker.patch("app.dependencies.radio_manager")
+        mock_rm.is_connected = True
+        mock_rm.meshcore = None
+        return mock_rm
+
+    @pytest.fixture
+    def broadcast(self, mocker, capture_task):
+        """Stub the bot run and background tasks a send schedules; return the broadcast mock."""
+        mocker.patch("app.bot.run_bot_for_message", new=AsyncMock())
+        mocker.patch("app.routers.messages.asyncio.create_task", side_effect=capture_task)
+        return mocker.patch("app.routers.messages.broadcast_event", create=True)
+
+    @pytest.mark.parametrize(
+        ("url", "payload"),
+        [
+            ("/api/messages/direct", {"destination": "abc123", "text": "Hello"}),
+            (
+                "/api/messages/channel",
+                {"channel_key": "0123456789ABCDEF0123456789ABCDEF", "text": "Hello"},
+            ),
+            ("/api/messages/channel/1/resend", None),
+        ],
+        ids=["direct", "channel", "resend"],
+    )
+    async def test_send_requires_connection(self, test_db, client, radio, url, payload):
+        """Sending or resending a message when disconnected returns 503."""
+        radio.is_connected = False
+
+        response = await client.post(url, json=payload)
+
+        assert response.status_code == 503
+        assert "not connected" in response.json()["detail"].lower()
+
+    async def test_send_direct_message_emits_websocket_message_event(
+        self, test_db, client, radio, broadcast
+    ):
+        """POST /messages/direct should emit a WS message event for other clients."""
+        pub_key = _PUB_KEY_AB
         await _insert_contact(pub_key, "Alice")
 
-        mock_mc = MagicMock()
-        mock_mc.get_contact_by_key_prefix.return_value = {"public_key": pub_key}
-        mock_mc.commands.add_contact = AsyncMock(
-            return_value=MagicMock(type=EventType.OK, payload={})
+        radio.meshcore = SimpleNamespace(
+            get_contact_by_key_prefix=lambda _prefix: {"public_key": pub_key},
+            commands=SimpleNamespace(
+                add_contact=AsyncMock(return_value=_OK_RESULT),
+                send_msg=AsyncMock(return_value=_SENT_RESULT),
+            ),
         )
-        mock_mc.commands.send_msg = AsyncMock(
-            return_value=MagicMock(type=EventType.MSG_SENT, payload={})
-        )
-
-        def _capture_task(coro):
-            coro.close()
-            return MagicMock()
-
-        with (
-            patch("app.dependencies.radio_manager") as mock_rm,
-            patch("app.bot.run_bot_for_message", new=AsyncMock()),
-            patch("app.routers.messages.asyncio.create_task", side_effect=_capture_task),
-            patch("app.routers.messages.broadcast_event", create=True) as mock_broadcast,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
 
-            response = await client.post(
-                "/api/messages/direct",
-                json={"destination": pub_key, "text": "Hello"},
-            )
-
-            assert response.status_code == 200
-            mock_broadcast.assert_called_once()
-            event_type, payload = mock_broadcast.call_args.args
-            assert event_type == "message"
-            assert payload["type"] == "PRIV"
-
-            # Verify message was stored in real DB
-            messages = await MessageRepository.get_all(conversation_key=pub_key)
-            assert len(messages) == 1
-            assert messages[0].text == "Hello"
+        response = await client.post(
+            "/api/messages/direct",
+            json={"destination": pub_key, "text": "Hello"},
+        )
 
-    @pytest.mark.asyncio
-    async def test_send_channel_message_emits_websocket_message_event(self, test_db, client):
+        assert response.status_code == 200
+        broadcast.assert_called_once()
+        event_type, payload = broadcast.call_args.args
+        assert event_type == "message"
+        assert payload["type"] == "PRIV"
+
+        # Verify message was stored in real DB
+        messages = await MessageRepository.get_all(conversation_key=pub_key)
+        assert len(messages) == 1
+        assert messages[0].text == "Hello"
+
+    async def test_send_channel_message_emits_websocket_message_event(
+        self, test_db, client, radio, broadcast, mocker
+    ):
         """POST /messages/channel should emit a WS message event for other clients."""
-        from meshcore import EventType
-
-        chan_key = "AA" * 16
+        chan_key = _CHAN_KEY_AA
         await ChannelRepository.upsert(key=chan_key, name="Public")
 
-        mock_mc = MagicMock()
-        mock_mc.self_info = {"name": "TestNode"}
-        ok_result = MagicMock(type=EventType.MSG_SENT, payload={})
-        mock_mc.commands.set_channel = AsyncMock(return_value=ok_result)
-        mock_mc.commands.send_chan_msg = AsyncMock(return_value=ok_result)
-
-        def _capture_task(coro):
-            coro.close()
-            return MagicMock()
-
-        with (
-            patch("app.dependencies.radio_manager") as mock_rm,
-            patch("app.decoder.calculate_channel_hash", return_value="abcd"),
-            patch("app.bot.run_bot_for_message", new=AsyncMock()),
-            patch("app.routers.messages.asyncio.create_task", side_effect=_capture_task),
-            patch("app.routers.messages.broadcast_event", create=True) as mock_broadcast,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
+        radio.meshcore = _channel_meshcore(_SENT_RESULT, _SENT_RESULT)
+        mocker.patch("app.decoder.calculate_channel_hash", return_value="abcd")
 
-            response = await client.post(
-                "/api/messages/channel",
-                json={"channel_key": chan_key, "text": "Hello room"},
-            )
+        response = await client.post(
+            "/api/messages/channel",
+            json={"channel_key": chan_key, "text": "Hello room"},
+        )
 
-            assert response.status_code == 200
-            mock_broadcast.assert_called_once()
-            event_type, payload = mock_broadcast.call_args.args
-            assert event_type == "message"
-            assert payload["type"] == "CHAN"
+        assert response.status_code == 200
+        broadcast.assert_called_once()
+        event_type, payload = broadcast.call_args.args
+        assert event_type == "message"
+        assert payload["type"] == "CHAN"
 
-    @pytest.mark.asyncio
-    async def test_send_direct_message_contact_not_found(self, test_db, client):
+    async def test_send_direct_message_contact_not_found(self, test_db, radio):
         """Sending to unknown contact returns 404."""
-        mock_mc = MagicMock()
-        mock_mc.get_contact_by_key_prefix.return_value = None
+        mock_mc = SimpleNamespace(get_contact_by_key_prefix=lambda _prefix: None)
 
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
+        radio.meshcore = mock_mc
 
-            response = await client.post(
-                "/api/messages/direct", json={"destination": "nonexistent", "text": "Hello"}
+        with pytest.raises(HTTPException) as exc_info:
+            await send_direct_message(
+                SendDirectMessageRequest(destination="nonexistent", text="Hello")
             )
 
-            assert response.status_code == 404
-            assert "not found" in response.json()["detail"].lower()
+        assert exc_info.value.status_code == 404
+        assert "not found" in exc_info.value.detail.lower()
 
-    @pytest.mark.asyncio
-    async def test_send_direct_message_duplicate_returns_500(self, test_db):
+    async def test_send_direct_message_duplicate_returns_500(self, test_db, mocker, radio):
         """If MessageRepository.create returns None (duplicate), returns 500."""
-        from app.models import SendDirectMessageRequest
-        from app.routers.messages import send_direct_message
-
-        pub_key = "a" * 64
+        pub_key = _DM_REQUEST.destination
         await _insert_contact(pub_key, "TestContact")
 
-        mock_mc = MagicMock()
-        mock_mc.get_contact_by_key_prefix.return_value = {"public_key": pub_key}
-        mock_mc.commands.add_contact = AsyncMock(
-            return_value=MagicMock(type=MagicMock(name="OK"), payload={})
-        )
-        mock_mc.commands.send_msg = AsyncMock(
-            return_value=MagicMock(type=MagicMock(name="OK"), payload={"expected_ack": b"\x00\x01"})
-        )
-
-        with (
-            patch("app.dependencies.radio_manager") as mock_rm,
-            patch("app.routers.messages.MessageRepository") as mock_msg_repo,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
-            # Simulate duplicate - create returns None
-            mock_msg_repo.create = AsyncMock(return_value=None)
+        mock_mc = _build_meshcore_mock(contact={"public_key": pub_key})
 
-            from fastapi import HTTPException
+        radio.meshcore = mock_mc
+        # Simulate duplicate - create returns None
+        mocker.patch("app.routers.messages.MessageRepository.create", new=_none_async)
 
-            with pytest.raises(HTTPException) as exc_info:
-                await send_direct_message(
-                    SendDirectMessageRequest(destination=pub_key, text="Hello")
-                )
+        with pytest.raises(HTTPException) as exc_info:
+            await send_direct_message(_DM_REQUEST)
 
-            assert exc_info.value.status_code == 500
-            assert "unexpected duplicate" in exc_info.value.detail.lower()
+        assert exc_info.value.status_code == 500
+        assert "unexpected duplicate" in exc_info.value.detail.lower()
 
-    @pytest.mark.asyncio
-    async def test_send_channel_message_duplicate_returns_500(self, test_db):
+    async def test_send_channel_message_duplicate_returns_500(self, test_db, mocker, radio):
         """If MessageRepository.create returns None (duplicate), returns 500."""
-        from app.models import SendChannelMessageRequest
-        from app.routers.messages import send_channel_message
+        await ChannelRepository.upsert(key=_CHANNEL_REQUEST.channel_key, name="test")
 
-        chan_key = "0123456789ABCDEF0123456789ABCDEF"
-        await ChannelRepository.upsert(key=chan_key, name="test")
+        mock_mc = _build_meshcore_mock()
 
-        mock_mc = MagicMock()
-        mock_mc.commands.send_chan_msg = AsyncMock(
-            return_value=MagicMock(type=MagicMock(name="OK"), payload={})
-        )
-        mock_mc.commands.set_channel = AsyncMock(
-            return_value=MagicMock(type=MagicMock(name="OK"), payload={})
-        )
-
-        with (
-            patch("app.dependencies.radio_manager") as mock_rm,
-            patch("app.routers.messages.MessageRepository") as mock_msg_repo,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
-            # Simulate duplicate - create returns None
-            mock_msg_repo.create = AsyncMock(return_value=None)
-
-            from fastapi import HTTPException
+        radio.meshcore = mock_mc
+        # Simulate duplicate - create returns None
+        mocker.patch("app.routers.messages.MessageRepository.create", new=_none_async)
 
-            with pytest.raises(HTTPException) as exc_info:
-                await send_channel_message(
-                    SendChannelMessageRequest(channel_key=chan_key, text="Hello")
-                )
+        with pytest.raises(HTTPException) as exc_info:
+            await send_channel_message(_CHANNEL_REQUEST)
 
-            assert exc_info.value.status_code == 500
-            assert "unexpected duplicate" in exc_info.value.detail.lower()
+        assert exc_info.value.status_code == 500
+        assert "unexpected duplicate" in exc_info.value.detail.lower()
 
-    @pytest.mark.asyncio
-    async def test_resend_channel_message_requires_connection(self, test_db, client):
-        """Resend endpoint returns 503 when radio is disconnected."""
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = False
-            mock_rm.meshcore = None
-
-            response = await client.post("/api/messages/channel/1/resend")
-
-            assert response.status_code == 503
-            assert "not connected" in response.json()["detail"].lower()
-
-    @pytest.mark.asyncio
-    async def test_resend_channel_message_success(self, test_db, client):
+    async def test_resend_channel_message_success(self, test_db, client, radio):
         """Resend endpoint reuses timestamp bytes and strips sender prefix."""
-        from meshcore import EventType
-
         chan_key = "AB" * 16
         await ChannelRepository.upsert(key=chan_key, name="#resend")
         sent_at = int(time.time()) - 5
@@ -345,21 +383,11 @@ class TestMessagesEndpoint:
         )
         assert msg_id is not None
 
-        mock_mc = MagicMock()
-        mock_mc.self_info = {"name": "TestNode"}
-        mock_mc.commands = MagicMock()
-        mock_mc.commands.set_channel = AsyncMock(
-            return_value=MagicMock(type=EventType.OK, payload={})
-        )
-        mock_mc.commands.send_chan_msg = AsyncMock(
-            return_value=MagicMock(type=EventType.MSG_SENT, payload={})
-        )
+        mock_mc = _channel_meshcore(_OK_RESULT, _SENT_RESULT)
 
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
+        radio.meshcore = mock_mc
 
-            response = await client.post(f"/api/messages/channel/{msg_id}/resend")
+        response = await client.post(f"/api/messages/channel/{msg_id}/resend")
 
         assert response.status_code == 200
         assert response.json() == {"status": "ok", "message_id": msg_id}
@@ -374,8 +402,7 @@ class TestMessagesEndpoint:
         assert send_kwargs["msg"] == "hello world"
         assert send_kwargs["timestamp"] == sent_at.to_bytes(4, "little")
 
-    @pytest.mark.asyncio
-    async def test_resend_channel_message_window_expired(self, test_db, client):
+    async def test_resend_channel_message_window_expired(self, test_db, client, radio):
         """Resend endpoint rejects channel messages older than 30 seconds."""
         chan_key = "CD" * 16
         await ChannelRepository.upsert(key=chan_key, name="#old")
@@ -390,37 +417,24 @@ class TestMessagesEndpoint:
         )
         assert msg_id is not None
 
-        mock_mc = MagicMock()
-        mock_mc.self_info = {"name": "TestNode"}
-        mock_mc.commands = MagicMock()
-        mock_mc.commands.set_channel = AsyncMock()
-        mock_mc.commands.send_chan_msg = AsyncMock()
+        mock_mc = _channel_meshcore()
 
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
+        radio.meshcore = mock_mc
 
-            response = await client.post(f"/api/messages/channel/{msg_id}/resend")
+        response = await client.post(f"/api/messages/channel/{msg_id}/resend")
 
         assert response.status_code == 400
         assert "expired" in response.json()["detail"].lower()
         assert mock_mc.commands.set_channel.await_count == 0
         assert mock_mc.commands.send_chan_msg.await_count == 0
 
-    @pytest.mark.asyncio
-    async def test_resend_channel_message_returns_404_for_missing(self, test_db, client):
+    async def test_resend_channel_message_returns_404_for_missing(self, test_db, client, radio):
         """Resend endpoint returns 404 for nonexistent message ID."""
-        mock_mc = MagicMock()
-        mock_mc.self_info = {"name": "TestNode"}
-        mock_mc.commands = MagicMock()
-        mock_mc.commands.set_channel = AsyncMock()
-        mock_mc.commands.send_chan_msg = AsyncMock()
-
-        with patch("app.dependencies.radio_manager") as mock_rm:
-            mock_rm.is_connected = True
-            mock_rm.meshcore = mock_mc
+        mock_mc = _channel_meshcore()
+
+        radio.meshcore = mock_mc
 
-            response = await client.post("/api/messages/channel/999999/resend")
+        response = await client.post("/api/messages/channel/999999/resend")
 
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
@@ -428,34 +442,28 @@ class TestMessagesEndpoint:
         assert mock_mc.commands.send_chan_msg.await_count == 0
 
 
+@pytest.mark.asyncio(loop_scope="module")
 class TestChannelsEndpoint:
     """Test channel-related endpoints."""
 
-    @pytest.mark.asyncio
     async def test_create_hashtag_channel_derives_key(self, test_db):
         """Creating hashtag channel derives key from name and stores in DB."""
-        from app.routers.channels import CreateChannelRequest, create_channel
-
         request = CreateChannelRequest(name="#mychannel")
         result = await create_channel(request)
 
         # Verify the key derivation
-        expected_key_hex = hashlib.sha256(b"#mychannel").digest()[:16].hex().upper()
-        assert result.key == expected_key_hex
+        assert result.key == _MYCHANNEL_KEY
         assert result.name == "#mychannel"
 
         # Verify stored in real DB
-        channel = await ChannelRepository.get_by_key(expected_key_hex)
+        channel = await ChannelRepository.get_by_key(_MYCHANNEL_KEY)
         assert channel is not None
         assert channel.name == "#mychannel"
         assert channel.is_hashtag is True
         assert channel.on_radio is False
 
-    @pytest.mark.asyncio
     async def test_create_channel_with_explicit_key(self, test_db):
         """Creating channel with explicit key uses provided key."""
-        from app.routers.channels import CreateChannelRequest, create_channel
-
         explicit_key = "0123456789abcdef0123456789abcdef"  # 32 hex chars = 16 bytes
         request = CreateChannelRequest(name="private", key=explicit_key)
         result = await create_channel(request)
@@ -469,133 +477,80 @@ class TestChannelsEndpoint:
         assert channel.on_radio is False
 
 
+@pytest.mark.asyncio(loop_scope="module")
 class TestPacketsEndpoint:
     """Test packet decryption endpoints."""
 
-    def test_get_undecrypted_count(self):
+    async def test_get_undecrypted_count(self):
         """Get undecrypted packet count returns correct value."""
-        from fastapi.testclient import TestClient
-
         with patch("app.routers.packets.RawPacketRepository") as mock_repo:
             mock_repo.get_undecrypted_count = AsyncMock(return_value=42)
 
-            from app.main import app
-
-            client = TestClient(app)
+            result = await get_undecrypted_count()
 
-            response = client.get("/api/packets/undecrypted/count")
-
-            assert response.status_code == 200
-            assert response.json()["count"] == 42
+        assert result == {"count": 42}
 
 
+@pytest.mark.asyncio(loop_scope="module")
 class TestReadStateEndpoints:
     """Test read state tracking endpoints."""
 
-    @pytest.mark.asyncio
-    async def test_mark_contact_read_updates_timestamp(self, test_db):
-        """Marking contact as read updates last_read_at in database."""
-        pub_key = "abc123def456789012345678901234567890123456789012345678901234"
-        await _insert_contact(pub_key, "TestContact")
-
-        before_time = int(time.time())
-
-        updated = await ContactRepository.update_last_read_at(pub_key)
-        assert updated is True
-
-        contact = await ContactRepository.get_by_key(pub_key)
-        assert contact is not None
-        assert contact.last_read_at is not None
-        assert contact.last_read_at >= before_time
-
-    @pytest.mark.asyncio
-    async def test_mark_channel_read_updates_timestamp(self, test_db):
-        """Marking channel as read updates last_read_at in database."""
-        chan_key = "0123456789ABCDEF0123456789ABCDEF"
-        await ChannelRepository.upsert(key=chan_key, name="#testchannel")
-
-        before_time = int(time.time())
-
-        updated = await ChannelRepository.update_last_read_at(chan_key)
-        assert updated is True
-
-        channel = await ChannelRepository.get_by_key(chan_key)
-        assert channel is not None
-        assert channel.last_read_at is not None
-        assert channel.last_read_at >= before_time
-
-    @pytest.mark.asyncio
-    async def test_mark_nonexistent_contact_returns_false(self, test_db):
-        """Marking nonexistent contact returns False."""
-        updated = await ContactRepository.update_last_read_at("nonexistent")
-        assert updated is False
-
-    @pytest.mark.asyncio
-    async def test_mark_contact_read_endpoint_returns_404_for_missing(self, test_db, client):
-        """Mark-read endpoint returns 404 for nonexistent contact."""
-        response = await client.post("/api/contacts/nonexistent/mark-read")
+    @pytest.mark.parametrize(
+        ("repo", "key", "seed"),
+        [
+            (ContactRepository, _PUB_KEY_AB, {"contacts": [(_PUB_KEY_AB, "TestContact", None)]}),
+            (ChannelRepository, _CHAN_KEY_AA, {"channels": [(_CHAN_KEY_AA, "#testchannel", None)]}),
+            (ContactRepository, "nonexistent", {}),
+        ],
+        ids=["contact", "channel", "missing-contact"],
+    )
+    async def test_mark_read_updates_timestamp(self, test_db, mocker, repo, key, seed):
+        """Marking as read stamps last_read_at with the current time; unknown keys return False."""
+        await _seed_conversations(test_db.conn, **seed)
+        mocker.patch("app.repository.time.time", return_value=_FROZEN_NOW)
+
+        updated = await repo.update_last_read_at(key)
+        assert updated is bool(seed)
+
+        if seed:
+            stored = await repo.get_by_key(key)
+            assert stored is not None
+            assert stored.last_read_at == int(_FROZEN_NOW)
+
+    @pytest.mark.parametrize(
+        "url",
+        ["/api/contacts/nonexistent/mark-read", "/api/channels/NONEXISTENT/mark-read"],
+        ids=["contact", "channel"],
+    )
+    async def test_mark_read_endpoint_returns_404_for_missing(self, test_db, client, url):
+        """Mark-read endpoints return 404 for a nonexistent contact or channel."""
+        response = await client.post(url)
 
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
 
-    @pytest.mark.asyncio
-    async def test_mark_channel_read_endpoint_returns_404_for_missing(self, test_db, client):
-        """Mark-read endpoint returns 404 for nonexistent channel."""
-        response = await client.post("/api/channels/NONEXISTENT/mark-read")
-
-        assert response.status_code == 404
-        assert "not found" in response.json()["detail"].lower()
-
-    @pytest.mark.asyncio
     async def test_get_unreads_returns_counts_and_mentions(self, test_db):
         """GET /unreads returns unread counts, mentions, and last message times."""
         chan_key = "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA1"
-        contact_key = "abcd" * 16
+        contact_key = _CONTACT_KEY_ABCD
 
-        await ChannelRepository.upsert(key=chan_key, name="Public")
-        await ChannelRepository.update_last_read_at(chan_key, 1000)
-        await _insert_contact(contact_key, "Alice")
-        await ContactRepository.update_last_read_at(contact_key, 1000)
-
-        # 2 unread channel msgs (received_at > last_read_at=1000), 1 read, 1 outgoing
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="Bob: hello",
-            received_at=1001,
-            conversation_key=chan_key,
-            sender_timestamp=1001,
-        )
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="Bob: @[testuser] hey",
-            received_at=1002,
-            conversation_key=chan_key,
-            sender_timestamp=1002,
-        )
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="Bob: old msg",
-            received_at=999,
-            conversation_key=chan_key,
-            sender_timestamp=999,
-        )
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="Me: outgoing",
-            received_at=1003,
-            conversation_key=chan_key,
-            sender_timestamp=1003,
-            outgoing=True,
-        )
-        # 1 unread DM with mention
-        await MessageRepository.create(
-            msg_type="PRIV",
-            text="hi @[TeStUsEr] there",
-            received_at=1005,
-            conversation_key=contact_key,
-            sender_timestamp=1005,
+        await _seed_conversations(
+            test_db.conn,
+            contacts=[(contact_key, "Alice", 1000)],
+            channels=[(chan_key, "Public", 1000)],
         )
 
+        rows = [
+            # 2 unread channel msgs (received_at > last_read_at=1000), 1 read, 1 outgoing
+            ("CHAN", chan_key, "Bob: hello", 1001, 1001, 0),
+            ("CHAN", chan_key, "Bob: @[testuser] hey", 1002, 1002, 0),
+            ("CHAN", chan_key, "Bob: old msg", 999, 999, 0),
+            ("CHAN", chan_key, "Me: outgoing", 1003, 1003, 1),
+            # 1 unread DM with mention
+            ("PRIV", contact_key, "hi @[TeStUsEr] there", 1005, 1005, 0),
+        ]
+        await _insert_messages(test_db.conn, *rows)
+
         result = await MessageRepository.get_unread_counts("TestUser")
 
         # Channel: 2 unread (1001 and 1002), one has mention
@@ -610,44 +565,29 @@ class TestReadStateEndpoints:
         assert result["last_message_times"][f"channel-{chan_key}"] == 1003
         assert result["last_message_times"][f"contact-{contact_key}"] == 1005
 
-    @pytest.mark.asyncio
     async def test_get_unreads_no_name_skips_mentions(self, test_db):
         """Unreads without a radio name returns counts but no mention flags."""
         chan_key = "CHAN1KEY1CHAN1KEY1CHAN1KEY1CHAN1KEY1"
-        await ChannelRepository.upsert(key=chan_key, name="Public")
-        await ChannelRepository.update_last_read_at(chan_key, 0)
+        await _seed_conversations(test_db.conn, channels=[(chan_key, "Public", 0)])
 
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="Bob: @[Alice] hey",
-            received_at=1001,
-            conversation_key=chan_key,
-            sender_timestamp=1001,
-        )
+        await _insert_messages(test_db.conn, ("CHAN", chan_key, "Bob: @[Alice] hey", 1001, 1001, 0))
 
         result = await MessageRepository.get_unread_counts(None)
 
         assert result["counts"][f"channel-{chan_key}"] == 1
         assert len(result["mentions"]) == 0
 
-    @pytest.mark.asyncio
     async def test_unreads_endpoint_sources_name_from_radio(self, test_db, client):
         """GET /unreads sources the user's name from the radio for mention detection."""
         chan_key = "MENTIONENDPOINT1MENTIONENDPOINT1"
-        await ChannelRepository.upsert(key=chan_key, name="Public")
-        await ChannelRepository.update_last_read_at(chan_key, 0)
+        await _seed_conversations(test_db.conn, channels=[(chan_key, "Public", 0)])
 
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="hey @[RadioUser] check this",
-            received_at=1001,
-            conversation_key=chan_key,
-            sender_timestamp=1001,
+        await _insert_messages(
+            test_db.conn, ("CHAN", chan_key, "hey @[RadioUser] check this", 1001, 1001, 0)
         )
 
         # Mock radio_manager.meshcore to return a name
-        mock_mc = MagicMock()
-        mock_mc.self_info = {"name": "RadioUser"}
+        mock_mc = SimpleNamespace(self_info={"name": "RadioUser"})
         with patch("app.routers.read_state.radio_manager") as mock_rm:
             mock_rm.meshcore = mock_mc
             response = await client.get("/api/read-state/unreads")
@@ -657,19 +597,13 @@ class TestReadStateEndpoints:
         assert data["counts"][f"channel-{chan_key}"] == 1
         assert data["mentions"][f"channel-{chan_key}"] is True
 
-    @pytest.mark.asyncio
     async def test_unreads_endpoint_no_radio_skips_mentions(self, test_db, client):
         """GET /unreads with no radio connected still returns counts without mentions."""
         chan_key = "NORADIOENDPOINT1NORADIOENDPOINT1"
-        await ChannelRepository.upsert(key=chan_key, name="Public")
-        await ChannelRepository.update_last_read_at(chan_key, 0)
+        await _seed_conversations(test_db.conn, channels=[(chan_key, "Public", 0)])
 
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="hey @[Someone] check this",
-            received_at=1001,
-            conversation_key=chan_key,
-            sender_timestamp=1001,
+        await _insert_messages(
+            test_db.conn, ("CHAN", chan_key, "hey @[Someone] check this", 1001, 1001, 0)
         )
 
         # Mock radio_manager.meshcore as None (disconnected)
@@ -682,27 +616,16 @@ class TestReadStateEndpoints:
         assert data["counts"][f"channel-{chan_key}"] == 1
         assert len(data["mentions"]) == 0
 
-    @pytest.mark.asyncio
     async def test_unreads_reset_after_mark_read(self, test_db):
         """Marking a conversation as read zeroes its unread count; new messages after count again."""
         chan_key = "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA1"
-        await ChannelRepository.upsert(key=chan_key, name="Public")
-        await ChannelRepository.update_last_read_at(chan_key, 1000)
+        await _seed_conversations(test_db.conn, channels=[(chan_key, "Public", 1000)])
 
         # 2 unread messages (received_at > last_read_at=1000)
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="msg1",
-            received_at=1001,
-            conversation_key=chan_key,
-            sender_timestamp=1001,
-        )
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="msg2",
-            received_at=1002,
-            conversation_key=chan_key,
-            sender_timestamp=1002,
+        await _insert_messages(
+            test_db.conn,
+            ("CHAN", chan_key, "msg1", 1001, 1001, 0),
+            ("CHAN", chan_key, "msg2", 1002, 1002, 0),
         )
 
         # Verify 2 unread
@@ -717,308 +640,220 @@ class TestReadStateEndpoints:
         assert result["counts"].get(f"channel-{chan_key}", 0) == 0
 
         # New message arrives after the read point
-        await MessageRepository.create(
-            msg_type="CHAN",
-            text="msg3",
-            received_at=1003,
-            conversation_key=chan_key,
-            sender_timestamp=1003,
-        )
+        await _insert_messages(test_db.conn, ("CHAN", chan_key, "msg3", 1003, 1003, 0))
 
         # Verify exactly 1 unread
         result = await MessageRepository.get_unread_counts(None)
         assert result["counts"][f"channel-{chan_key}"] == 1
 
-    @pytest.mark.asyncio
     async def test_unreads_exclude_outgoing_messages(self, test_db):
         """Outgoing messages should never count as unread."""
-        contact_key = "abcd" * 16
-        await _insert_contact(contact_key, "Bob")
-        await ContactRepository.update_last_read_at(contact_key, 1000)
+        contact_key = _CONTACT_KEY_ABCD
+        await _seed_conversations(test_db.conn, contacts=[(contact_key, "Bob", 1000)])
 
         # 1 incoming (should count) + 2 outgoing (should NOT count)
-        await MessageRepository.create(
-            msg_type="PRIV",
-            text="incoming msg",
-            received_at=1001,
-            conversation_key=contact_key,
-            sender_timestamp=1001,
-        )
-        await MessageRepository.create(
-            msg_type="PRIV",
-            text="my reply",
-            received_at=1002,
-            conversation_key=contact_key,
-            sender_timestamp=1002,
-            outgoing=True,
-        )
-        await MessageRepository.create(
-            msg_type="PRIV",
-            text="another reply",
-            received_at=1003,
-            conversation_key=contact_key,
-            sender_timestamp=1003,
-            outgoing=True,
-        )
+        rows = [
+            ("PRIV", contact_key, "incoming msg", 1001, 1001, 0),
+            ("PRIV", contact_key, "my reply", 1002, 1002, 1),
+            ("PRIV", contact_key, "another reply", 1003, 1003, 1),
+        ]
+        await _insert_messages(test_db.conn, *rows)
 
         result = await MessageRepository.get_unread_counts(None)
         # Only the 1 incoming message should count as unread
         assert result["counts"][f"contact-{contact_key}"] == 1
 
-    @pytest.mark.asyncio
-    async def test_mark_all_read_updates_all_conversations(self, test_db):
+    async def test_mark_all_read_updates_all_conversations(self, test_db, mocker):
         """Bulk mark-all-read updates all contacts and channels."""
-        await _insert_contact("contact1", "Alice")
-        await _insert_contact("contact2", "Bob")
-        await ChannelRepository.upsert(key="CHAN1KEY1CHAN1KEY1CHAN1KEY1CHAN1KEY1", name="#test1")
-        await ChannelRepository.upsert(key="CHAN2KEY2CHAN2KEY2CHAN2KEY2CHAN2KEY2", name="#test2")
-
-        before_time = int(time.time())
+        await _seed_conversations(
+            test_db.conn,
+            contacts=[("contact1", "Alice", None), ("contact2", "Bob", None)],
+            channels=[
+                ("CHAN1KEY1CHAN1KEY1CHAN1KEY1CHAN1KEY1", "#test1", None),
+                ("CHAN2KEY2CHAN2KEY2CHAN2KEY2CHAN2KEY2", "#test2", None),
+            ],
+        )
 
-        from app.routers.read_state import mark_all_read
+        mocker.patch("app.routers.read_state.time.time", return_value=_FROZEN_NOW)
 
         result = await mark_all_read()
 
         assert result["status"] == "ok"
-        assert result["timestamp"] >= before_time
-
-        # Verify all contacts updated
-        for key in ["contact1", "contact2"]:
-            contact = await ContactRepository.get_by_key(key)
-            assert contact.last_read_at >= before_time
-
-        # Verify all channels updated
-        for key in ["CHAN1KEY1CHAN1KEY1CHAN1KEY1CHAN1KEY1", "CHAN2KEY2CHAN2KEY2CHAN2KEY2CHAN2KEY2"]:
-            channel = await ChannelRepository.get_by_key(key)
-            assert channel.last_read_at >= before_time
+        assert result["timestamp"] == int(_FROZEN_NOW)
+
+        # Every contact and channel carries the returned timestamp (NULLs count as stale)
+        cursor = await test_db.conn.execute(
+            """
+            SELECT (SELECT COUNT(*) FROM contacts WHERE last_read_at IS NOT :ts),
+                   (SELECT COUNT(*) FROM channels WHERE last_read_at IS NOT :ts)
+            """,
+            {"ts": result["timestamp"]},
+        )
+        assert tuple(await cursor.fetchone()) == (0, 0)
 
 
+@pytest.mark.asyncio(loop_scope="module")
 class TestRawPacketRepository:
     """Test raw packet storage with deduplication."""
 
-    @pytest.mark.asyncio
-    async def test_create_returns_id_for_new_packet(self, test_db):
-        """First insert of packet data returns a valid ID."""
-        packet_data = b"\x01\x02\x03\x04\x05"
-        packet_id, is_new = await RawPacketRepository.create(packet_data, 1234567890)
-
-        assert packet_id is not None
-        assert packet_id > 0
-        assert is_new is True
-
-    @pytest.mark.asyncio
-    async def test_different_packets_both_stored(self, test_db):
-        """Different packet data both get stored with unique IDs."""
-        packet1 = b"\x01\x02\x03"
-        packet2 = b"\x04\x05\x06"
-
-        id1, is_new1 = await RawPacketRepository.create(packet1, 1234567890)
-        id2, is_new2 = await RawPacketRepository.create(packet2, 1234567891)
-
-        assert id1 is not None
-        assert id2 is not None
-        assert id1 != id2
-        assert is_new1 is True
-        assert is_new2 is True
-
-    @pytest.mark.asyncio
-    async def test_duplicate_packet_returns_existing_id(self, test_db):
-        """Inserting same payload twice returns existing ID and is_new=False."""
-        # Same packet data inserted twice
-        packet_data = b"\x01\x02\x03\x04\x05"
-        id1, is_new1 = await RawPacketRepository.create(packet_data, 1234567890)
-        id2, is_new2 = await RawPacketRepository.create(packet_data, 1234567891)
-
-        # Both should return the same ID
-        assert id1 == id2
-        # First is new, second is not
-        assert is_new1 is True
-        assert is_new2 is False
-
-    @pytest.mark.asyncio
-    async def test_malformed_packet_uses_full_data_hash(self, test_db):
-        """Malformed packets (can't extract payload) hash full data for dedup."""
-        # Single byte is too short to be valid packet (extract_payload returns None)
-        malformed = b"\x01"
-        id1, is_new1 = await RawPacketRepository.create(malformed, 1234567890)
-        id2, is_new2 = await RawPacketRepository.create(malformed, 1234567891)
-
-        # Should still deduplicate using full data hash
-        assert id1 == id2
+    @pytest.mark.parametrize(
+        ("first", "second", "expect_dedup"),
+        [
+            (_PKT_FIVE, _PKT_FIVE, True),
+            (_PKT_SHORT, _PKT_ALT, False),
+            # A single byte is too short to parse, so dedup falls back to the full data
+            (b"\x01", b"\x01", True),
+            (b"\x01", b"\x02", False),
+        ],
+        ids=["same-payload", "different-payload", "same-malformed", "different-malformed"],
+    )
+    async def test_create_deduplicates_by_payload(self, test_db, first, second, expect_dedup):
+        """A repeated payload returns the existing ID with is_new=False; others get new rows."""
+        id1, is_new1 = await RawPacketRepository.create(first, 1234567890)
+        id2, is_new2 = await RawPacketRepository.create(second, 1234567891)
+
+        assert id1 > 0
         assert is_new1 is True
-        assert is_new2 is False
+        if expect_dedup:
+            assert id2 == id1
+            assert is_new2 is False
+        else:
+            assert id2 != id1
+            assert is_new2 is True
 
-        # Different malformed packet should get different ID
-        different_malformed = b"\x02"
-        id3, is_new3 = await RawPacketRepository.create(different_malformed, 1234567892)
-        assert id3 != id1
-        assert is_new3 is True
-
-    @pytest.mark.asyncio
     async def test_prune_old_undecrypted_deletes_old_packets(self, test_db):
         """Prune deletes undecrypted packets older than specified days."""
         now = int(time.time())
         old_timestamp = now - (15 * 86400)  # 15 days ago
         recent_timestamp = now - (5 * 86400)  # 5 days ago
 
-        # Insert old undecrypted packet
-        await RawPacketRepository.create(b"\x01\x02\x03", old_timestamp)
-        # Insert recent undecrypted packet
-        await RawPacketRepository.create(b"\x04\x05\x06", recent_timestamp)
-        # Insert old but decrypted packet (should NOT be deleted)
-        old_id, _ = await RawPacketRepository.create(b"\x07\x08\x09", old_timestamp)
-        await RawPacketRepository.mark_decrypted(old_id, 1)
+        await _seed_packets(
+            test_db.conn,
+            (old_timestamp, _PKT_SHORT, None),  # old undecrypted
+            (recent_timestamp, _PKT_ALT, None),  # recent undecrypted
+            (old_timestamp, _PKT_DEC, 1),  # old but decrypted (should NOT be deleted)
+        )
 
         # Prune packets older than 10 days
         deleted = await RawPacketRepository.prune_old_undecrypted(10)
 
         assert deleted == 1  # Only the old undecrypted packet
 
-    @pytest.mark.asyncio
     async def test_prune_old_undecrypted_returns_zero_when_nothing_to_delete(self, test_db):
         """Prune returns 0 when no packets match criteria."""
         now = int(time.time())
         recent_timestamp = now - (5 * 86400)  # 5 days ago
 
         # Insert only recent packet
-        await RawPacketRepository.create(b"\x01\x02\x03", recent_timestamp)
+        await _seed_packets(test_db.conn, (recent_timestamp, _PKT_SHORT, None))
 
         # Prune packets older than 10 days (none should match)
         deleted = await RawPacketRepository.prune_old_undecrypted(10)
         assert deleted == 0
 
 
+@pytest.mark.asyncio(loop_scope="module")
 class TestMaintenanceEndpoint:
     """Test database maintenance endpoint."""
 
-    @pytest.mark.asyncio
-    async def test_maintenance_prunes_and_vacuums(self, test_db):
+    @pytest.fixture
+    async def file_db(self, tmp_path, monkeypatch):
+        """A migrated file database that both pruning and the VACUUM connection use.
+
+        run_maintenance opens its own connection to db.db_path, so the in-memory
+        module database can't stand in here.
+        """
+        file_db = Database(str(tmp_path / "maintenance.db"))
+        await file_db.connect()
+        # Migrations can leave free pages behind; start every test from none.
+        await file_db.conn.execute("VACUUM")
+        monkeypatch.setattr(db, "db_path", file_db.db_path)
+        try:
+            with db.override_connection(file_db.conn):
+                yield file_db
+        finally:
+            await file_db.disconnect()
+
+    @staticmethod
+    async def _free_pages(database) -> int:
+        cursor = await database.conn.execute("PRAGMA freelist_count")
+        return (await cursor.fetchone())[0]
+
+    async def test_maintenance_prunes_and_vacuums(self, file_db):
         """Maintenance endpoint prunes old packets and runs vacuum."""
-        from app.routers.packets import MaintenanceRequest, run_maintenance
-
         now = int(time.time())
         old_timestamp = now - (20 * 86400)  # 20 days ago
 
         # Insert old undecrypted packets
-        await RawPacketRepository.create(b"\x01\x02\x03", old_timestamp)
-        await RawPacketRepository.create(b"\x04\x05\x06", old_timestamp)
+        await _seed_packets(
+            file_db.conn,
+            (old_timestamp, _PKT_SHORT, None),
+            (old_timestamp, _PKT_ALT, None),
+        )
 
         request = MaintenanceRequest(prune_undecrypted_days=14)
         result = await run_maintenance(request)
 
         assert result.packets_deleted == 2
         assert result.vacuumed is True
+        assert await self._free_pages(file_db) == 0
 
+    async def test_maintenance_vacuums_free_pages_without_pruning(self, file_db):
+        """Free pages left by earlier deletes are reclaimed even if nothing is pruned."""
+        now = int(time.time())
+        await _seed_packets(file_db.conn, *((now, bytes([i]) * 4000, None) for i in range(50)))
+        await file_db.conn.execute("DELETE FROM raw_packets")
+        await file_db.conn.commit()
+        assert await self._free_pages(file_db) > 0
 
-class TestHealthEndpointDatabaseSize:
-    """Test database size reporting in health endpoint."""
-
-    def test_health_includes_database_size(self):
-        """Health endpoint includes database_size_mb field."""
-        from unittest.mock import patch
-
-        from fastapi.testclient import TestClient
-
-        with (
-            patch("app.routers.health.radio_manager") as mock_rm,
-            patch("app.routers.health.os.path.getsize") as mock_getsize,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.connection_info = "Serial: /dev/ttyUSB0"
-            mock_getsize.return_value = 10 * 1024 * 1024  # 10 MB
-
-            from app.main import app
-
-            client = TestClient(app)
-
-            response = client.get("/api/health")
-
-            assert response.status_code == 200
-            data = response.json()
-            assert "database_size_mb" in data
-            assert data["database_size_mb"] == 10.0
-
-
-class TestHealthEndpointOldestUndecrypted:
-    """Test oldest undecrypted packet timestamp in health endpoint."""
-
-    def test_health_includes_oldest_undecrypted_timestamp(self):
-        """Health endpoint includes oldest_undecrypted_timestamp when packets exist."""
-        from unittest.mock import AsyncMock, patch
-
-        from fastapi.testclient import TestClient
-
-        with (
-            patch("app.routers.health.radio_manager") as mock_rm,
-            patch("app.routers.health.os.path.getsize") as mock_getsize,
-            patch("app.routers.health.RawPacketRepository") as mock_repo,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.connection_info = "Serial: /dev/ttyUSB0"
-            mock_getsize.return_value = 5 * 1024 * 1024  # 5 MB
-            mock_repo.get_oldest_undecrypted = AsyncMock(return_value=1700000000)
-
-            from app.main import app
-
-            client = TestClient(app)
-
-            response = client.get("/api/health")
-
-            assert response.status_code == 200
-            data = response.json()
-            assert "oldest_undecrypted_timestamp" in data
-            assert data["oldest_undecrypted_timestamp"] == 1700000000
-
-    def test_health_oldest_undecrypted_null_when_none(self):
-        """Health endpoint returns null for oldest_undecrypted_timestamp when no packets."""
-        from unittest.mock import AsyncMock, patch
-
-        from fastapi.testclient import TestClient
-
-        with (
-            patch("app.routers.health.radio_manager") as mock_rm,
-            patch("app.routers.health.os.path.getsize") as mock_getsize,
-            patch("app.routers.health.RawPacketRepository") as mock_repo,
-        ):
-            mock_rm.is_connected = True
-            mock_rm.connection_info = "Serial: /dev/ttyUSB0"
-            mock_getsize.return_value = 1 * 1024 * 1024  # 1 MB
-            mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
-
-            from app.main import app
-
-            client = TestClient(app)
-
-            response = client.get("/api/health")
-
-            assert response.status_code == 200
-            data = response.json()
-            assert "oldest_undecrypted_timestamp" in data
-            assert data["oldest_undecrypted_timestamp"] is None
-
-    def test_health_handles_db_not_connected(self):
-        """Health endpoint gracefully handles database not connected."""
-        from unittest.mock import AsyncMock, patch
-
-        from fastapi.testclient import TestClient
-
-        with (
-            patch("app.routers.health.radio_manager") as mock_rm,
-            patch("app.routers.health.os.path.getsize") as mock_getsize,
-            patch("app.routers.health.RawPacketRepository") as mock_repo,
-        ):
-            mock_rm.is_connected = False
-            mock_rm.connection_info = None
-            mock_getsize.side_effect = OSError("File not found")
-            mock_repo.get_oldest_undecrypted = AsyncMock(side_effect=RuntimeError("No DB"))
-
-            from app.main import app
+        result = await run_maintenance(MaintenanceRequest(prune_undecrypted_days=14))
 
-            client = TestClient(app)
+        assert result.packets_deleted == 0
+        assert result.vacuumed is True
+        assert await self._free_pages(file_db) == 0
+
+    async def test_maintenance_skips_vacuum_when_nothing_to_reclaim(self, file_db):
+        """No pruned packets and no free pages means VACUUM is skipped."""
+        assert await self._free_pages(file_db) == 0
+
+        result = await run_maintenance(MaintenanceRequest(prune_undecrypted_days=14))
+
+        assert result.packets_deleted == 0
+        assert result.vacuumed is False
+
+
+class TestHealthEndpointDatabaseState:
+    """Test database size and oldest undecrypted packet reporting in health endpoint."""
+
+    @pytest.mark.parametrize(
+        ("db_size", "oldest", "expected_mb", "expected_oldest"),
+        [
+            (10 * 1024 * 1024, None, 10.0, None),
+            (5 * 1024 * 1024, 1700000000, 5.0, 1700000000),
+            # Both lookups fail: missing DB file and database not connected
+            (OSError("File not found"), RuntimeError("No DB"), 0.0, None),
+        ],
+        ids=["size-only", "oldest-undecrypted", "db-unavailable"],
+    )
+    def test_health_reports_database_state(
+        self, sync_client, mocker, db_size, oldest, expected_mb, expected_oldest
+    ):
+        """Health endpoint reports database size and oldest undecrypted packet time."""
+        # One-element side_effect lists return the value, or raise it if it is an exception
+        mocker.patch.multiple(
+            "app.routers.health",
+            radio_manager=SimpleNamespace(
+                is_connected=True, connection_info="Serial: /dev/ttyUSB0"
+            ),
+            RawPacketRepository=SimpleNamespace(
+                get_oldest_undecrypted=AsyncMock(side_effect=[oldest])
+            ),
+        )
+        mocker.patch("app.routers.health.os.path.getsize", side_effect=[db_size])
 
-            response = client.get("/api/health")
+        response = sync_client.get("/api/health")
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["oldest_undecrypted_timestamp"] is None
-            assert data["database_size_mb"] == 0.0
+        assert response.status_code == 200
+        data = response.json()
+        assert data["database_size_mb"] == expected_mb
+        assert data["oldest_undecrypted_timestamp"] == expected_oldest
@@ -1,204 +1,127 @@
 """Tests for the bot execution module."""
 
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
 
 import pytest
+from fastapi import HTTPException
 
 import app.bot as bot_module
 from app.bot import (
     BOT_MESSAGE_SPACING,
-    _bot_semaphore,
+    MAX_CONCURRENT_BOTS,
     execute_bot_code,
     process_bot_response,
     run_bot_for_message,
 )
 from app.models import BotConfig
+from app.routers.settings import validate_all_bots, validate_bot_code
 
+# Current 9-parameter bot signature; most snippets below only vary the body.
+_BOT_DEF = (
+    "def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, "
+    "sender_timestamp, path, is_outgoing):\n"
+)
 
-class TestExecuteBotCode:
-    """Test bot code execution."""
+# A DM from Alice, passed to execute_bot_code by the result-handling tests.
+_DM_KWARGS = {
+    "sender_name": "Alice",
+    "sender_key": "abc123",
+    "message_text": "Hi",
+    "is_dm": True,
+    "channel_key": None,
+    "channel_name": None,
+    "sender_timestamp": None,
+    "path": None,
+}
 
-    def test_valid_code_returning_string(self):
-        """Bot code that returns a string works correctly."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return f"Hello, {sender_name}!"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result == "Hello, Alice!"
 
-    def test_valid_code_returning_none(self):
-        """Bot code that returns None works correctly."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return None
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
+def _named_bot(n: int, enabled: bool = True) -> BotConfig:
+    """A bot whose code starts with a '# Bot <n>' marker the fake executor reads back."""
+    return BotConfig(
+        id=str(n), name=f"Bot {n}", enabled=enabled, code=f"# Bot {n}\ndef bot(): pass"
+    )
 
-    def test_empty_string_response_treated_as_none(self):
-        """Bot returning empty/whitespace string is treated as None."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return "   "
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
 
-    def test_code_with_syntax_error(self):
-        """Bot code with syntax error returns None."""
-        code = """
-def bot(sender_name:
-    return "broken"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
+def _settings(*bots: BotConfig) -> SimpleNamespace:
+    """Stand-in for AppSettings; the bot runner only reads `.bots`."""
+    return SimpleNamespace(bots=list(bots))
 
-    def test_code_without_bot_function(self):
-        """Code that doesn't define 'bot' function returns None."""
-        code = """
-def my_function():
-    return "hello"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
 
-    def test_bot_not_callable(self):
-        """Code where 'bot' is not callable returns None."""
-        code = """
-bot = "I'm a string, not a function"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
+@pytest.fixture
+def fresh_bot_semaphore(monkeypatch):
+    """Give the test its own full concurrency semaphore instead of the shared global."""
+    monkeypatch.setattr(bot_module, "_bot_semaphore", asyncio.Semaphore(MAX_CONCURRENT_BOTS))
 
-    def test_bot_function_raises_exception(self):
-        """Bot function that raises exception returns None."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    raise ValueError("oops!")
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
 
-    def test_bot_returns_non_string(self):
-        """Bot function returning non-string returns None."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return 42
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
-
-    def test_empty_code_returns_none(self):
-        """Empty bot code returns None."""
-        result = execute_bot_code(
-            code="",
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
+class TestExecuteBotCode:
+    """Test bot code execution."""
 
-    def test_whitespace_only_code_returns_none(self):
-        """Whitespace-only bot code returns None."""
-        result = execute_bot_code(
-            code="   \n\t  ",
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result is None
+    @pytest.mark.parametrize(
+        ("code", "extra", "expected"),
+        [
+            pytest.param(
+                _BOT_DEF + '    return f"Hello, {sender_name}!"', {}, "Hello, Alice!", id="string"
+            ),
+            pytest.param(_BOT_DEF + "    return None", {}, None, id="none"),
+            pytest.param(_BOT_DEF + '    return "   "', {}, None, id="blank-string"),
+            pytest.param('def bot(sender_name:\n    return "broken"', {}, None, id="syntax-error"),
+            pytest.param('def my_function():\n    return "hello"', {}, None, id="no-bot-function"),
+            pytest.param('bot = "I\'m a string, not a function"', {}, None, id="bot-not-callable"),
+            pytest.param(_BOT_DEF + '    raise ValueError("oops!")', {}, None, id="bot-raises"),
+            pytest.param(_BOT_DEF + "    return 42", {}, None, id="non-string"),
+            pytest.param("", {}, None, id="empty-code"),
+            pytest.param("   \n\t  ", {}, None, id="whitespace-code"),
+            pytest.param(
+                _BOT_DEF + '    return f"outgoing={is_outgoing}"',
+                {},
+                "outgoing=False",
+                id="is-outgoing-defaults-false",
+            ),
+            pytest.param(
+                _BOT_DEF + '    if is_outgoing:\n        return None\n    return "reply"',
+                {"is_outgoing": True},
+                None,
+                id="is-outgoing-true",
+            ),
+            # Legacy 8-parameter bots are called without is_outgoing
+            pytest.param(
+                "def bot(sender_name, sender_key, message_text, is_dm, channel_key, "
+                'channel_name, sender_timestamp, path):\n    return f"Hello, {sender_name}!"',
+                {"is_outgoing": True},
+                "Hello, Alice!",
+                id="legacy-8-param",
+            ),
+            # ...unless they take **kwargs, which then receive it by keyword
+            pytest.param(
+                "def bot(sender_name, sender_key, message_text, is_dm, channel_key, "
+                "channel_name, sender_timestamp, path, **kwargs):\n"
+                "    return f\"outgoing={kwargs.get('is_outgoing', 'missing')}\"",
+                {"is_outgoing": True},
+                "outgoing=True",
+                id="legacy-kwargs",
+            ),
+            pytest.param(
+                _BOT_DEF + '    return ["First message", "Second message", "Third message"]',
+                {},
+                ["First message", "Second message", "Third message"],
+                id="list",
+            ),
+            pytest.param(_BOT_DEF + "    return []", {}, None, id="empty-list"),
+            # Only valid non-empty strings remain
+            pytest.param(
+                _BOT_DEF + '    return ["Valid", "", "  ", "Also valid", None, 42]',
+                {},
+                ["Valid", "Also valid"],
+                id="list-filtered",
+            ),
+            pytest.param(_BOT_DEF + '    return ["", "   ", ""]', {}, None, id="list-all-blank"),
+        ],
+    )
+    def test_result_handling(self, code, extra, expected):
+        """Bot results are normalized, and bad code or failing bots yield None."""
+        assert execute_bot_code(code=code, **_DM_KWARGS, **extra) == expected
 
     def test_bot_receives_all_parameters(self):
         """Bot function receives all expected parameters including is_outgoing."""
@@ -234,87 +157,6 @@ def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name,
             == "name=Bob|key=def456|msg=Test|dm=False|ch_key=AABBCCDD|ch_name=#test|ts=12345|path=001122|outgoing=True"
         )
 
-    def test_is_outgoing_defaults_to_false(self):
-        """is_outgoing defaults to False when not specified."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return f"outgoing={is_outgoing}"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-        )
-        assert result == "outgoing=False"
-
-    def test_is_outgoing_true_passed_correctly(self):
-        """is_outgoing=True is passed to bot function."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    if is_outgoing:
-        return None
-    return "reply"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-            is_outgoing=True,
-        )
-        assert result is None
-
-    def test_legacy_8_param_bot_still_works(self):
-        """Legacy bot with 8 parameters (no is_outgoing) still works."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path):
-    return f"Hello, {sender_name}!"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-            is_outgoing=True,
-        )
-        assert result == "Hello, Alice!"
-
-    def test_legacy_bot_with_kwargs_receives_is_outgoing(self):
-        """Legacy bot using **kwargs receives is_outgoing."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, **kwargs):
-    return f"outgoing={kwargs.get('is_outgoing', 'missing')}"
-"""
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
-            is_dm=True,
-            channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
-            is_outgoing=True,
-        )
-        assert result == "outgoing=True"
-
     def test_channel_message_with_none_sender_key(self):
         """Channel messages correctly pass None for sender_key."""
         code = """
@@ -336,405 +178,208 @@ def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name,
         )
         assert result == "channel message detected"
 
-    def test_bot_returns_list_of_strings(self):
-        """Bot function returning list of strings works correctly."""
+    def test_repeated_code_reuses_compiled_object_with_fresh_globals(self):
+        """Identical bot code compiles once, but each call still runs in a new namespace."""
         code = """
+calls = []
 def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return ["First message", "Second message", "Third message"]
+    calls.append(message_text)
+    return f"{len(calls)}:{message_text}"
 """
-        result = execute_bot_code(
-            code=code,
-            sender_name="Alice",
+        bot_module.compile_bot_code.cache_clear()
+        results = [
+            execute_bot_code(code=code, **{**_DM_KWARGS, "message_text": text})
+            for text in ("a", "b")
+        ]
+
+        # Module-level state in the bot code does not leak between messages
+        assert results == ["1:a", "1:b"]
+        cache = bot_module.compile_bot_code.cache_info()
+        assert (cache.misses, cache.hits) == (1, 1)
+
+
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.usefixtures("fresh_bot_semaphore")
+class TestRunBotForMessage:
+    """Test the main bot entry point."""
+
+    @pytest.fixture
+    def settings_get(self, mocker):
+        """Stand-in for AppSettingsRepository.get; each test sets what it returns."""
+        return mocker.patch("app.repository.AppSettingsRepository.get", new_callable=AsyncMock)
+
+    @pytest.fixture
+    def mock_exec(self, mocker):
+        """Replace execute_bot_code so tests can assert whether any bot ran."""
+        return mocker.patch("app.bot.execute_bot_code")
+
+    async def test_runs_for_outgoing_messages(self, settings_get):
+        """Bot is triggered for outgoing messages (user can trigger their own bots)."""
+        # No enabled bots, but settings ARE checked
+        settings_get.return_value = _settings()
+
+        await run_bot_for_message(
+            sender_name="Me",
             sender_key="abc123",
-            message_text="Hi",
+            message_text="Hello",
             is_dm=True,
             channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
+            is_outgoing=True,
         )
-        assert result == ["First message", "Second message", "Third message"]
 
-    def test_bot_returns_empty_list(self):
-        """Bot function returning empty list is treated as None."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return []
-"""
-        result = execute_bot_code(
-            code=code,
+        # Should check settings (outgoing no longer skipped)
+        settings_get.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "bots",
+        [
+            [_named_bot(1, enabled=False)],
+            [],
+            [
+                BotConfig(id="1", name="Empty Bot", enabled=True, code=""),
+                BotConfig(id="2", name="Whitespace Bot", enabled=True, code="   "),
+            ],
+        ],
+        ids=["no-enabled-bots", "empty-bots-array", "empty-code"],
+    )
+    async def test_skips_when_no_runnable_bot(self, settings_get, mock_exec, bots):
+        """Bot code is not executed unless some bot is both enabled and has code."""
+        settings_get.return_value = _settings(*bots)
+
+        await run_bot_for_message(
             sender_name="Alice",
             sender_key="abc123",
-            message_text="Hi",
+            message_text="Hello",
             is_dm=True,
             channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
         )
-        assert result is None
 
-    def test_bot_returns_list_with_empty_strings_filtered(self):
-        """Bot function returning list filters out empty/whitespace strings."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return ["Valid", "", "  ", "Also valid", None, 42]
-"""
-        result = execute_bot_code(
-            code=code,
+        mock_exec.assert_not_called()
+
+    async def test_rechecks_settings_after_sleep(self, settings_get, mock_exec, mocker):
+        """Settings are re-checked after 2 second sleep."""
+        # First call: bot enabled; second call (after sleep): bot disabled
+        settings_get.side_effect = [
+            _settings(_named_bot(1)),
+            _settings(_named_bot(1, enabled=False)),
+        ]
+        mock_sleep = mocker.patch("app.bot.asyncio.sleep", new_callable=AsyncMock)
+
+        await run_bot_for_message(
             sender_name="Alice",
             sender_key="abc123",
-            message_text="Hi",
+            message_text="Hello",
             is_dm=True,
             channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
         )
-        # Only valid non-empty strings should remain
-        assert result == ["Valid", "Also valid"]
 
-    def test_bot_returns_list_all_empty_treated_as_none(self):
-        """Bot function returning list of all empty strings is treated as None."""
-        code = """
-def bot(sender_name, sender_key, message_text, is_dm, channel_key, channel_name, sender_timestamp, path, is_outgoing):
-    return ["", "   ", ""]
-"""
-        result = execute_bot_code(
-            code=code,
+        # Should have slept
+        mock_sleep.assert_called_once_with(2)
+
+        # Should NOT have executed bot (disabled after sleep)
+        mock_exec.assert_not_called()
+
+
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.usefixtures("fresh_bot_semaphore")
+class TestMultipleBots:
+    """Test multiple bots functionality."""
+
+    @pytest.fixture
+    def runner(self, monkeypatch):
+        """Stub everything run_bot_for_message calls out to.
+
+        Tests fill in `bots` and `outcomes` (bot name -> reply, or an exception to
+        raise); `executed` records bot names in call order and `respond` stands in
+        for process_bot_response.
+        """
+        state = SimpleNamespace(bots=[], outcomes={}, executed=[], respond=AsyncMock())
+
+        async def get_settings():
+            return _settings(*state.bots)
+
+        async def no_sleep(delay):
+            pass
+
+        def fake_execute(code, *args):
+            name = code.partition("\n")[0].removeprefix("# ")
+            state.executed.append(name)
+            outcome = state.outcomes.get(name)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        monkeypatch.setattr("app.repository.AppSettingsRepository.get", get_settings)
+        monkeypatch.setattr(bot_module.asyncio, "sleep", no_sleep)
+        monkeypatch.setattr(bot_module, "execute_bot_code", fake_execute)
+        monkeypatch.setattr(bot_module, "process_bot_response", state.respond)
+        return state
+
+    async def _run(self):
+        await run_bot_for_message(
             sender_name="Alice",
-            sender_key="abc123",
-            message_text="Hi",
+            sender_key="abc123" + "0" * 58,
+            message_text="Hello",
             is_dm=True,
             channel_key=None,
-            channel_name=None,
-            sender_timestamp=None,
-            path=None,
         )
-        assert result is None
 
+    async def test_multiple_bots_execute_serially(self, runner):
+        """Multiple enabled bots execute serially in order."""
+        runner.bots = [_named_bot(1), _named_bot(2)]
+        runner.outcomes = {"Bot 1": "Response 1", "Bot 2": "Response 2"}
 
-class TestRunBotForMessage:
-    """Test the main bot entry point."""
+        await self._run()
 
-    @pytest.fixture(autouse=True)
-    def reset_semaphore(self):
-        """Reset semaphore state between tests."""
-        # Ensure semaphore is fully released
-        while _bot_semaphore.locked():
-            _bot_semaphore.release()
-        yield
+        # Both bots should have executed in order
+        assert runner.executed == ["Bot 1", "Bot 2"]
 
-    @pytest.mark.asyncio
-    async def test_runs_for_outgoing_messages(self):
-        """Bot is triggered for outgoing messages (user can trigger their own bots)."""
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = []  # No enabled bots, but settings ARE checked
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            await run_bot_for_message(
-                sender_name="Me",
-                sender_key="abc123",
-                message_text="Hello",
-                is_dm=True,
-                channel_key=None,
-                is_outgoing=True,
-            )
-
-            # Should check settings (outgoing no longer skipped)
-            mock_repo.get.assert_called_once()
-
-    @pytest.mark.asyncio
-    async def test_skips_when_no_enabled_bots(self):
-        """Bot is not triggered when no bots are enabled."""
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=False, code="def bot(): pass")
-            ]
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with patch("app.bot.execute_bot_code") as mock_exec:
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123",
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                mock_exec.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_skips_when_bots_array_empty(self):
-        """Bot is not triggered when bots array is empty."""
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = []
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with patch("app.bot.execute_bot_code") as mock_exec:
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123",
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                mock_exec.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_skips_bot_with_empty_code(self):
-        """Bot with empty code is skipped even if enabled."""
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = [
-                BotConfig(id="1", name="Empty Bot", enabled=True, code=""),
-                BotConfig(id="2", name="Whitespace Bot", enabled=True, code="   "),
-            ]
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with patch("app.bot.execute_bot_code") as mock_exec:
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123",
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                mock_exec.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_rechecks_settings_after_sleep(self):
-        """Settings are re-checked after 2 second sleep."""
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            # First call: bot enabled
-            # Second call (after sleep): bot disabled
-            mock_settings_enabled = MagicMock()
-            mock_settings_enabled.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=True, code="def bot(): return 'hi'")
-            ]
-
-            mock_settings_disabled = MagicMock()
-            mock_settings_disabled.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=False, code="def bot(): return 'hi'")
-            ]
-
-            mock_repo.get = AsyncMock(side_effect=[mock_settings_enabled, mock_settings_disabled])
-
-            with (
-                patch("app.bot.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
-                patch("app.bot.execute_bot_code") as mock_exec,
-            ):
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123",
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                # Should have slept
-                mock_sleep.assert_called_once_with(2)
-
-                # Should NOT have executed bot (disabled after sleep)
-                mock_exec.assert_not_called()
+    async def test_disabled_bots_are_skipped(self, runner):
+        """Disabled bots in the array are skipped."""
+        runner.bots = [_named_bot(1), _named_bot(2, enabled=False), _named_bot(3)]
 
+        await self._run()
 
-class TestMultipleBots:
-    """Test multiple bots functionality."""
+        # Only enabled bots should have executed
+        assert runner.executed == ["Bot 1", "Bot 3"]
 
-    @pytest.fixture(autouse=True)
-    def reset_semaphore(self):
-        """Reset semaphore state between tests."""
-        while _bot_semaphore.locked():
-            _bot_semaphore.release()
-        yield
-
-    @pytest.fixture(autouse=True)
-    def reset_rate_limit_state(self):
-        """Reset rate limiting state between tests."""
-        bot_module._last_bot_send_time = 0.0
-        yield
-        bot_module._last_bot_send_time = 0.0
-
-    @pytest.mark.asyncio
-    async def test_multiple_bots_execute_serially(self):
-        """Multiple enabled bots execute serially in order."""
-        executed_bots = []
-
-        def mock_execute(code, *args, **kwargs):
-            # Extract bot identifier from the code
-            if "Bot 1" in code:
-                executed_bots.append("Bot 1")
-                return "Response 1"
-            elif "Bot 2" in code:
-                executed_bots.append("Bot 2")
-                return "Response 2"
-            return None
-
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=True, code="# Bot 1\ndef bot(): pass"),
-                BotConfig(id="2", name="Bot 2", enabled=True, code="# Bot 2\ndef bot(): pass"),
-            ]
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with (
-                patch("app.bot.asyncio.sleep", new_callable=AsyncMock),
-                patch("app.bot.execute_bot_code", side_effect=mock_execute),
-                patch("app.bot.process_bot_response", new_callable=AsyncMock),
-            ):
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123" + "0" * 58,
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                # Both bots should have executed in order
-                assert executed_bots == ["Bot 1", "Bot 2"]
-
-    @pytest.mark.asyncio
-    async def test_disabled_bots_are_skipped(self):
-        """Disabled bots in the array are skipped."""
-        executed_bots = []
-
-        def mock_execute(code, *args, **kwargs):
-            if "Bot 1" in code:
-                executed_bots.append("Bot 1")
-            elif "Bot 2" in code:
-                executed_bots.append("Bot 2")
-            elif "Bot 3" in code:
-                executed_bots.append("Bot 3")
-            return None
-
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=True, code="# Bot 1\ndef bot(): pass"),
-                BotConfig(id="2", name="Bot 2", enabled=False, code="# Bot 2\ndef bot(): pass"),
-                BotConfig(id="3", name="Bot 3", enabled=True, code="# Bot 3\ndef bot(): pass"),
-            ]
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with (
-                patch("app.bot.asyncio.sleep", new_callable=AsyncMock),
-                patch("app.bot.execute_bot_code", side_effect=mock_execute),
-            ):
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123" + "0" * 58,
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                # Only enabled bots should have executed
-                assert executed_bots == ["Bot 1", "Bot 3"]
-
-    @pytest.mark.asyncio
-    async def test_error_in_one_bot_doesnt_stop_others(self):
+    async def test_error_in_one_bot_doesnt_stop_others(self, runner):
         """Error in one bot doesn't prevent other bots from running."""
-        executed_bots = []
-
-        def mock_execute(code, *args, **kwargs):
-            if "Bot 1" in code:
-                executed_bots.append("Bot 1")
-                raise ValueError("Bot 1 crashed!")
-            elif "Bot 2" in code:
-                executed_bots.append("Bot 2")
-                return "Response 2"
-            elif "Bot 3" in code:
-                executed_bots.append("Bot 3")
-                return "Response 3"
-            return None
-
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=True, code="# Bot 1\ndef bot(): pass"),
-                BotConfig(id="2", name="Bot 2", enabled=True, code="# Bot 2\ndef bot(): pass"),
-                BotConfig(id="3", name="Bot 3", enabled=True, code="# Bot 3\ndef bot(): pass"),
-            ]
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with (
-                patch("app.bot.asyncio.sleep", new_callable=AsyncMock),
-                patch("app.bot.execute_bot_code", side_effect=mock_execute),
-                patch("app.bot.process_bot_response", new_callable=AsyncMock) as mock_respond,
-            ):
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123" + "0" * 58,
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                # All bots should have been attempted
-                assert executed_bots == ["Bot 1", "Bot 2", "Bot 3"]
-
-                # Responses from successful bots should have been sent
-                assert mock_respond.call_count == 2
-
-    @pytest.mark.asyncio
-    async def test_timeout_in_one_bot_doesnt_stop_others(self):
+        runner.bots = [_named_bot(1), _named_bot(2), _named_bot(3)]
+        runner.outcomes = {
+            "Bot 1": ValueError("Bot 1 crashed!"),
+            "Bot 2": "Response 2",
+            "Bot 3": "Response 3",
+        }
+
+        await self._run()
+
+        # All bots should have been attempted
+        assert runner.executed == ["Bot 1", "Bot 2", "Bot 3"]
+
+        # Responses from successful bots should have been sent
+        assert runner.respond.call_count == 2
+
+    async def test_timeout_in_one_bot_doesnt_stop_others(self, runner, monkeypatch):
         """Timeout in one bot doesn't prevent other bots from running."""
-        executed_bots = []
+        runner.bots = [_named_bot(1), _named_bot(2), _named_bot(3)]
+        runner.outcomes = {"Bot 1": "Response 1", "Bot 2": "Response 2", "Bot 3": "Response 3"}
 
-        async def mock_wait_for(coro, timeout):
+        async def wait_for_timing_out_bot_2(coro, timeout):
             result = await coro
-            # Simulate timeout for Bot 2
-            if len(executed_bots) == 2 and executed_bots[-1] == "Bot 2":
+            if runner.executed[-1] == "Bot 2":
                 raise asyncio.TimeoutError()
             return result
 
-        def mock_execute(code, *args, **kwargs):
-            if "Bot 1" in code:
-                executed_bots.append("Bot 1")
-                return "Response 1"
-            elif "Bot 2" in code:
-                executed_bots.append("Bot 2")
-                return "Response 2"  # This will be "timed out"
-            elif "Bot 3" in code:
-                executed_bots.append("Bot 3")
-                return "Response 3"
-            return None
-
-        with patch("app.repository.AppSettingsRepository") as mock_repo:
-            mock_settings = MagicMock()
-            mock_settings.bots = [
-                BotConfig(id="1", name="Bot 1", enabled=True, code="# Bot 1\ndef bot(): pass"),
-                BotConfig(id="2", name="Bot 2", enabled=True, code="# Bot 2\ndef bot(): pass"),
-                BotConfig(id="3", name="Bot 3", enabled=True, code="# Bot 3\ndef bot(): pass"),
-            ]
-            mock_repo.get = AsyncMock(return_value=mock_settings)
-
-            with (
-                patch("app.bot.asyncio.sleep", new_callable=AsyncMock),
-                patch("app.bot.execute_bot_code", side_effect=mock_execute),
-                patch("app.bot.asyncio.wait_for", side_effect=mock_wait_for),
-                patch("app.bot.process_bot_response", new_callable=AsyncMock) as mock_respond,
-            ):
-                await run_bot_for_message(
-                    sender_name="Alice",
-                    sender_key="abc123" + "0" * 58,
-                    message_text="Hello",
-                    is_dm=True,
-                    channel_key=None,
-                )
-
-                # All bots should have been attempted
-                assert executed_bots == ["Bot 1", "Bot 2", "Bot 3"]
-
-                # Only responses from non-timed-out bots (Bot 1 and Bot 3)
-                assert mock_respond.call_count == 2
+        monkeypatch.setattr(bot_module.asyncio, "wait_for", wait_for_timing_out_bot_2)
+
+        await self._run()
+
+        # All bots should have been attempted
+        assert runner.executed == ["Bot 1", "Bot 2", "Bot 3"]
+
+        # Only responses from non-timed-out bots (Bot 1 and Bot 3)
+        assert runner.respond.call_count == 2
 
 
 class TestBotCodeValidation:
@@ -742,17 +387,11 @@ class TestBotCodeValidation:
 
     def test_valid_code_passes(self):
         """Valid Python code passes validation."""
-        from app.routers.settings import validate_bot_code
-
         # Should not raise
         validate_bot_code("def bot(): return 'hello'")
 
     def test_syntax_error_raises(self):
         """Syntax error in code raises HTTPException."""
-        from fastapi import HTTPException
-
-        from app.routers.settings import validate_bot_code
-
         with pytest.raises(HTTPException) as exc_info:
             validate_bot_code("def bot(:\n    return 'broken'")
 
@@ -761,30 +400,28 @@ class TestBotCodeValidation:
 
     def test_syntax_error_includes_bot_name(self):
         """Syntax error message includes bot name when provided."""
-        from fastapi import HTTPException
-
-        from app.routers.settings import validate_bot_code
-
         with pytest.raises(HTTPException) as exc_info:
             validate_bot_code("def bot(:\n    return 'broken'", bot_name="My Test Bot")
 
         assert exc_info.value.status_code == 400
         assert "My Test Bot" in exc_info.value.detail
 
+    def test_compile_time_error_raises(self):
+        """Errors only the compiler catches (not the parser) are rejected too."""
+        with pytest.raises(HTTPException) as exc_info:
+            validate_bot_code("return 'outside a function'")
+
+        assert exc_info.value.status_code == 400
+        assert "'return' outside function" in exc_info.value.detail
+
     def test_empty_code_passes(self):
         """Empty code passes validation (disables bot)."""
-        from app.routers.settings import validate_bot_code
-
         # Should not raise
         validate_bot_code("")
         validate_bot_code("   ")
 
     def test_validate_all_bots(self):
         """validate_all_bots validates all bots' code."""
-        from fastapi import HTTPException
-
-        from app.routers.settings import validate_all_bots
-
         # Valid bots should pass
         valid_bots = [
             BotConfig(id="1", name="Bot 1", enabled=True, code="def bot(): return 'hi'"),
@@ -803,324 +440,210 @@ class TestBotCodeValidation:
         assert "Bad Bot" in exc_info.value.detail
 
 
+# Reply destinations for the send tests: a 64-char public key and a 32-char channel key.
+_PEER_KEY = "abc123def456" * 4
+_CHANNEL_KEY = "AABBCCDD" * 4
+
+
+class _FakeClock:
+    """Replaces time.monotonic and asyncio.sleep; sleeping advances the clock."""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, duration: float) -> None:
+        self.sleeps.append(duration)
+        self.now += duration
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake clock for the send rate limiter, starting at t=100 with no prior send."""
+    fake = _FakeClock()
+    monkeypatch.setattr(bot_module, "_last_bot_send_time", 0.0)
+    monkeypatch.setattr(bot_module.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(bot_module.asyncio, "sleep", fake.sleep)
+    return fake
+
+
+@pytest.fixture
+def sent(monkeypatch, clock):
+    """Record (text, send time) for every DM or channel message the bot sends."""
+    records: list[tuple[str, float]] = []
+
+    async def fake_send(request):
+        records.append((request.text, clock.now))
+
+    monkeypatch.setattr("app.routers.messages.send_direct_message", fake_send)
+    monkeypatch.setattr("app.routers.messages.send_channel_message", fake_send)
+    return records
+
+
+@pytest.mark.asyncio(loop_scope="module")
 class TestBotMessageRateLimiting:
     """Test bot message rate limiting for repeater compatibility."""
 
-    @pytest.fixture(autouse=True)
-    def reset_rate_limit_state(self):
-        """Reset rate limiting state between tests."""
-        bot_module._last_bot_send_time = 0.0
-        yield
-        bot_module._last_bot_send_time = 0.0
-
-    @pytest.mark.asyncio
-    async def test_first_send_does_not_wait(self):
+    async def test_first_send_does_not_wait(self, clock, sent):
         """First bot send should not wait (no previous send)."""
-        with (
-            patch("app.bot.time.monotonic", return_value=100.0),
-            patch("app.bot.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
-            patch("app.routers.messages.send_direct_message", new_callable=AsyncMock) as mock_send,
-            patch("app.websocket.broadcast_event"),
-        ):
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            mock_send.return_value = mock_message
-
-            await process_bot_response(
-                response="Hello!",
-                is_dm=True,
-                sender_key="abc123def456" * 4,  # 64 chars
-                channel_key=None,
-            )
-
-            # Should not have slept (first send, _last_bot_send_time was 0)
-            mock_sleep.assert_not_called()
-            mock_send.assert_called_once()
-
-    @pytest.mark.asyncio
-    async def test_rapid_second_send_waits(self):
+        await process_bot_response(
+            response="Hello!",
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        # Should not have slept (first send, _last_bot_send_time was 0)
+        assert clock.sleeps == []
+        assert len(sent) == 1
+
+    async def test_rapid_second_send_waits(self, clock, sent):
         """Second send within spacing window should wait."""
         # Previous send was at 100.0, current time is 100.5 (0.5 seconds later)
         # So we need to wait 1.5 more seconds to reach 2.0 second spacing
         bot_module._last_bot_send_time = 100.0
+        clock.now = 100.5
+
+        await process_bot_response(
+            response="Hello again!",
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        assert clock.sleeps == [pytest.approx(1.5)]
 
-        with (
-            patch("app.bot.time.monotonic", return_value=100.5),
-            patch("app.bot.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
-            patch("app.routers.messages.send_direct_message", new_callable=AsyncMock) as mock_send,
-            patch("app.websocket.broadcast_event"),
-        ):
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            mock_send.return_value = mock_message
-
-            await process_bot_response(
-                response="Hello again!",
-                is_dm=True,
-                sender_key="abc123def456" * 4,
-                channel_key=None,
-            )
-
-            # Should have waited 1.5 seconds (2.0 - 0.5 elapsed)
-            mock_sleep.assert_called_once()
-            wait_time = mock_sleep.call_args[0][0]
-            assert abs(wait_time - 1.5) < 0.01
-
-    @pytest.mark.asyncio
-    async def test_send_after_spacing_does_not_wait(self):
+    async def test_send_after_spacing_does_not_wait(self, clock, sent):
         """Send after spacing window should not wait."""
         # Simulate a previous send 3 seconds ago (> BOT_MESSAGE_SPACING)
         bot_module._last_bot_send_time = 97.0
 
-        with (
-            patch("app.bot.time.monotonic", return_value=100.0),
-            patch("app.bot.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
-            patch("app.routers.messages.send_direct_message", new_callable=AsyncMock) as mock_send,
-            patch("app.websocket.broadcast_event"),
-        ):
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            mock_send.return_value = mock_message
-
-            await process_bot_response(
-                response="Hello!",
-                is_dm=True,
-                sender_key="abc123def456" * 4,
-                channel_key=None,
-            )
-
-            # Should not have slept (3 seconds > 2 second spacing)
-            mock_sleep.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_timestamp_updated_after_successful_send(self):
+        await process_bot_response(
+            response="Hello!",
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        assert clock.sleeps == []
+
+    async def test_timestamp_updated_after_successful_send(self, clock, sent):
         """Last send timestamp should be updated after successful send."""
-        with (
-            patch("app.bot.time.monotonic", return_value=150.0),
-            patch("app.routers.messages.send_direct_message", new_callable=AsyncMock) as mock_send,
-            patch("app.websocket.broadcast_event"),
-        ):
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            mock_send.return_value = mock_message
-
-            await process_bot_response(
-                response="Hello!",
-                is_dm=True,
-                sender_key="abc123def456" * 4,
-                channel_key=None,
-            )
-
-            assert bot_module._last_bot_send_time == 150.0
-
-    @pytest.mark.asyncio
-    async def test_timestamp_not_updated_on_failure(self):
-        """Last send timestamp should NOT be updated if send fails."""
-        from fastapi import HTTPException
+        clock.now = 150.0
+
+        await process_bot_response(
+            response="Hello!",
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        assert bot_module._last_bot_send_time == 150.0
 
+    async def test_timestamp_not_updated_on_failure(self, clock, monkeypatch):
+        """Last send timestamp should NOT be updated if send fails."""
         bot_module._last_bot_send_time = 50.0  # Previous timestamp
 
-        with (
-            patch("app.bot.time.monotonic", return_value=100.0),
-            patch(
-                "app.routers.messages.send_direct_message",
-                new_callable=AsyncMock,
-                side_effect=HTTPException(status_code=500, detail="Send failed"),
-            ),
-        ):
-            await process_bot_response(
-                response="Hello!",
-                is_dm=True,
-                sender_key="abc123def456" * 4,
-                channel_key=None,
-            )
-
-            # Timestamp should remain unchanged
-            assert bot_module._last_bot_send_time == 50.0
-
-    @pytest.mark.asyncio
-    async def test_timestamp_not_updated_on_no_destination(self):
+        async def failing_send(request):
+            raise HTTPException(status_code=500, detail="Send failed")
+
+        monkeypatch.setattr("app.routers.messages.send_direct_message", failing_send)
+
+        await process_bot_response(
+            response="Hello!",
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        # Timestamp should remain unchanged
+        assert bot_module._last_bot_send_time == 50.0
+
+    async def test_timestamp_not_updated_on_no_destination(self, clock):
         """Last send timestamp should NOT be updated if no destination."""
         bot_module._last_bot_send_time = 50.0
 
-        with patch("app.bot.time.monotonic", return_value=100.0):
-            await process_bot_response(
-                response="Hello!",
-                is_dm=False,  # Not a DM
-                sender_key="",
-                channel_key=None,  # No channel either
-            )
+        await process_bot_response(
+            response="Hello!",
+            is_dm=False,  # Not a DM
+            sender_key="",
+            channel_key=None,  # No channel either
+        )
 
-            # Timestamp should remain unchanged
-            assert bot_module._last_bot_send_time == 50.0
+        # Timestamp should remain unchanged
+        assert bot_module._last_bot_send_time == 50.0
 
-    @pytest.mark.asyncio
-    async def test_concurrent_sends_are_serialized(self):
+    async def test_concurrent_sends_are_serialized(self, sent):
         """Multiple concurrent sends should be serialized by the lock."""
-        send_order = []
-        send_times = []
-
-        async def mock_send(*args, **kwargs):
-            send_order.append(len(send_order))
-            send_times.append(bot_module.time.monotonic())
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            return mock_message
-
-        # Use a real monotonic-like counter for this test
-        time_counter = [100.0]
-
-        def mock_monotonic():
-            return time_counter[0]
-
-        async def mock_sleep(duration):
-            time_counter[0] += duration
-
-        with (
-            patch("app.bot.time.monotonic", side_effect=mock_monotonic),
-            patch("app.bot.asyncio.sleep", side_effect=mock_sleep),
-            patch("app.routers.messages.send_direct_message", side_effect=mock_send),
-            patch("app.websocket.broadcast_event"),
-        ):
-            # Launch 3 concurrent sends
-            await asyncio.gather(
-                process_bot_response("Msg 1", True, "a" * 64, None),
-                process_bot_response("Msg 2", True, "b" * 64, None),
-                process_bot_response("Msg 3", True, "c" * 64, None),
-            )
-
-            # All 3 should have sent
-            assert len(send_order) == 3
-
-            # Each send should be at least BOT_MESSAGE_SPACING apart
-            # First send at 100, second at 102, third at 104
-            assert send_times[1] >= send_times[0] + BOT_MESSAGE_SPACING - 0.01
-            assert send_times[2] >= send_times[1] + BOT_MESSAGE_SPACING - 0.01
-
-    @pytest.mark.asyncio
-    async def test_channel_message_rate_limited(self):
+        await asyncio.gather(
+            process_bot_response("Msg 1", True, "a" * 64, None),
+            process_bot_response("Msg 2", True, "b" * 64, None),
+            process_bot_response("Msg 3", True, "c" * 64, None),
+        )
+
+        # All 3 should have sent
+        assert len(sent) == 3
+
+        # Each send should be at least BOT_MESSAGE_SPACING apart
+        # First send at 100, second at 102, third at 104
+        send_times = [at for _, at in sent]
+        assert send_times[1] >= send_times[0] + BOT_MESSAGE_SPACING - 0.01
+        assert send_times[2] >= send_times[1] + BOT_MESSAGE_SPACING - 0.01
+
+    async def test_channel_message_rate_limited(self, clock, sent):
         """Channel message sends should also be rate limited."""
         bot_module._last_bot_send_time = 99.0  # 1 second ago
 
-        with (
-            patch("app.bot.time.monotonic", return_value=100.0),
-            patch("app.bot.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
-            patch("app.routers.messages.send_channel_message", new_callable=AsyncMock) as mock_send,
-            patch("app.websocket.broadcast_event"),
-        ):
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            mock_send.return_value = mock_message
-
-            await process_bot_response(
-                response="Channel hello!",
-                is_dm=False,
-                sender_key="",
-                channel_key="AABBCCDD" * 4,
-            )
-
-            # Should have waited 1 second (2.0 - 1.0 elapsed)
-            mock_sleep.assert_called_once()
-            wait_time = mock_sleep.call_args[0][0]
-            assert abs(wait_time - 1.0) < 0.01
-            mock_send.assert_called_once()
+        await process_bot_response(
+            response="Channel hello!",
+            is_dm=False,
+            sender_key="",
+            channel_key=_CHANNEL_KEY,
+        )
+
+        # Should have waited 1 second (2.0 - 1.0 elapsed)
+        assert clock.sleeps == [pytest.approx(1.0)]
+        assert [text for text, _ in sent] == ["Channel hello!"]
 
 
+@pytest.mark.asyncio(loop_scope="module")
 class TestBotListResponses:
     """Test bot functionality for list responses."""
 
-    @pytest.fixture(autouse=True)
-    def reset_rate_limit_state(self):
-        """Reset rate limiting state between tests."""
-        bot_module._last_bot_send_time = 0.0
-        yield
-        bot_module._last_bot_send_time = 0.0
-
-    @pytest.mark.asyncio
-    async def test_list_response_sends_multiple_messages(self):
+    async def test_list_response_sends_multiple_messages(self, sent):
         """List response should send multiple messages in order."""
-        sent_messages = []
-
-        async def mock_send(request):
-            sent_messages.append(request.text)
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            return mock_message
-
-        with (
-            patch("app.bot.time.monotonic", return_value=100.0),
-            patch("app.bot.asyncio.sleep", new_callable=AsyncMock),
-            patch("app.routers.messages.send_direct_message", side_effect=mock_send),
-            patch("app.websocket.broadcast_event"),
-        ):
-            await process_bot_response(
-                response=["First", "Second", "Third"],
-                is_dm=True,
-                sender_key="a" * 64,
-                channel_key=None,
-            )
-
-            assert sent_messages == ["First", "Second", "Third"]
-
-    @pytest.mark.asyncio
-    async def test_list_response_rate_limited_between_messages(self):
+        await process_bot_response(
+            response=["First", "Second", "Third"],
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        assert [text for text, _ in sent] == ["First", "Second", "Third"]
+
+    async def test_list_response_rate_limited_between_messages(self, clock, sent):
         """Each message in a list should be rate limited."""
-        sleep_calls = []
-
-        time_counter = [100.0]
-
-        def mock_monotonic():
-            return time_counter[0]
-
-        async def mock_sleep(duration):
-            sleep_calls.append(duration)
-            time_counter[0] += duration
-
-        async def mock_send(request):
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            return mock_message
-
-        with (
-            patch("app.bot.time.monotonic", side_effect=mock_monotonic),
-            patch("app.bot.asyncio.sleep", side_effect=mock_sleep),
-            patch("app.routers.messages.send_direct_message", side_effect=mock_send),
-            patch("app.websocket.broadcast_event"),
-        ):
-            await process_bot_response(
-                response=["First", "Second", "Third"],
-                is_dm=True,
-                sender_key="a" * 64,
-                channel_key=None,
-            )
-
-            # Should have waited between messages (after first send)
-            # First message: no wait, Second: wait 2s, Third: wait 2s
-            assert len(sleep_calls) == 2
-            assert all(abs(w - BOT_MESSAGE_SPACING) < 0.01 for w in sleep_calls)
-
-    @pytest.mark.asyncio
-    async def test_string_response_still_works(self):
+        await process_bot_response(
+            response=["First", "Second", "Third"],
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        # Should have waited between messages (after first send)
+        # First message: no wait, Second: wait 2s, Third: wait 2s
+        assert clock.sleeps == [pytest.approx(BOT_MESSAGE_SPACING)] * 2
+
+    async def test_string_response_still_works(self, sent):
         """Single string response should still work after list support added."""
-        sent_messages = []
-
-        async def mock_send(request):
-            sent_messages.append(request.text)
-            mock_message = MagicMock()
-            mock_message.model_dump.return_value = {}
-            return mock_message
-
-        with (
-            patch("app.bot.time.monotonic", return_value=100.0),
-            patch("app.bot.asyncio.sleep", new_callable=AsyncMock),
-            patch("app.routers.messages.send_direct_message", side_effect=mock_send),
-            patch("app.websocket.broadcast_event"),
-        ):
-            await process_bot_response(
-                response="Just one message",
-                is_dm=True,
-                sender_key="a" * 64,
-                channel_key=None,
-            )
-
-            assert sent_messages == ["Just one message"]
+        await process_bot_response(
+            response="Just one message",
+            is_dm=True,
+            sender_key=_PEER_KEY,
+            channel_key=None,
+        )
+
+        assert [text for text, _ in sent] == ["Just one message"]
@@ -12,7 +12,7 @@ import httpx
 import pytest
 from meshcore import EventType
 
-from app.database import Database
+from app.main import app
 from app.repository import ContactRepository
 
 # Sample 64-char hex public keys for testing
@@ -21,24 +21,6 @@ KEY_B = "bb" * 32  # bbbb...bb
 KEY_C = "cc" * 32  # cccc...cc
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database with schema + migrations."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 async def _insert_contact(public_key=KEY_A, name="Alice", on_radio=False, **overrides):
     """Insert a contact into the test database."""
     data = {
@@ -62,8 +44,6 @@ async def _insert_contact(public_key=KEY_A, name="Alice", on_radio=False, **over
 @pytest.fixture
 def client():
     """Create an httpx AsyncClient for testing the app."""
-    from app.main import app
-
     transport = httpx.ASGITransport(app=app)
     return httpx.AsyncClient(transport=transport, base_url="http://test")
 
@@ -10,7 +10,6 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.database import Database
 from app.decoder import DecryptedDirectMessage
 from app.repository import (
     ContactRepository,
@@ -19,24 +18,6 @@ from app.repository import (
 )
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 @pytest.fixture
 def captured_broadcasts():
     """Capture WebSocket broadcasts for verification."""
@@ -9,7 +9,6 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.database import Database
 from app.event_handlers import (
     _active_subscriptions,
     _cleanup_expired_acks,
@@ -23,24 +22,6 @@ from app.repository import (
 )
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database with schema + migrations."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 @pytest.fixture(autouse=True)
 def clear_test_state():
     """Clear pending ACKs and subscriptions before each test."""
@@ -207,17 +188,13 @@ class TestContactMessageCLIFiltering:
             assert len(messages) == 0
 
     @pytest.mark.asyncio
-    async def test_normal_message_schedules_bot_in_background(self, test_db):
+    async def test_normal_message_schedules_bot_in_background(self, test_db, capture_task):
         """Normal messages should schedule bot execution without blocking."""
         from app.event_handlers import on_contact_message
 
-        def _capture_task(coro):
-            coro.close()
-            return MagicMock()
-
         with (
             patch("app.event_handlers.broadcast_event"),
-            patch("app.event_handlers.asyncio.create_task", side_effect=_capture_task) as mock_task,
+            patch("app.event_handlers.asyncio.create_task", side_effect=capture_task) as mock_task,
             patch("app.bot.run_bot_for_message", new_callable=AsyncMock) as mock_bot,
         ):
 
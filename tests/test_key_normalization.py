@@ -2,28 +2,9 @@
 
 import pytest
 
-from app.database import Database
 from app.repository import AmbiguousPublicKeyPrefixError, ContactRepository, MessageRepository
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 @pytest.mark.asyncio
 async def test_upsert_stores_lowercase_key(test_db):
     await ContactRepository.upsert(
@@ -2,28 +2,9 @@
 
 import pytest
 
-from app.database import Database
 from app.repository import MessageRepository
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 @pytest.mark.asyncio
 async def test_cursor_pagination_avoids_overlap(test_db):
     key = "ABC123DEF456ABC123DEF456ABC12345"
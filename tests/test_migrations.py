@@ -6,428 +6,416 @@ import pytest
 from app.migrations import get_version, run_migrations, set_version
 
 
+@pytest.fixture
+async def conn():
+    """In-memory connection with aiosqlite's default isolation level, as Database.connect uses.
+
+    Migrations therefore run under the same implicit-transaction semantics as in
+    production, where their commit() calls are what make each step durable.
+    """
+    connection = await aiosqlite.connect(":memory:")
+    connection.row_factory = aiosqlite.Row
+    yield connection
+    await connection.close()
+
+
+# Pre-migration raw_packets (for migrations 2 and 3) and messages (for migrations 6 and 7).
+# Tests append this to their own contacts/channels DDL and create everything in one
+# executescript call instead of one aiosqlite round trip per statement.
+_LEGACY_PACKETS_AND_MESSAGES_DDL = """
+    CREATE TABLE raw_packets (
+        id INTEGER PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        decrypted INTEGER DEFAULT 0,
+        message_id INTEGER,
+        decrypt_attempts INTEGER DEFAULT 0,
+        last_attempt INTEGER
+    );
+    CREATE INDEX idx_raw_packets_decrypted ON raw_packets(decrypted);
+    CREATE TABLE messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        conversation_key TEXT NOT NULL,
+        text TEXT NOT NULL,
+        sender_timestamp INTEGER,
+        received_at INTEGER NOT NULL,
+        path_len INTEGER,
+        txt_type INTEGER DEFAULT 0,
+        signature TEXT,
+        outgoing INTEGER DEFAULT 0,
+        acked INTEGER DEFAULT 0,
+        UNIQUE(type, conversation_key, text, sender_timestamp)
+    );
+"""
+
+
 class TestMigrationSystem:
     """Test the migration version tracking system."""
 
     @pytest.mark.asyncio
-    async def test_get_version_returns_zero_for_new_db(self):
+    async def test_get_version_returns_zero_for_new_db(self, conn):
         """New database has user_version=0."""
-        conn = await aiosqlite.connect(":memory:")
-        try:
-            version = await get_version(conn)
-            assert version == 0
-        finally:
-            await conn.close()
+        version = await get_version(conn)
+        assert version == 0
 
     @pytest.mark.asyncio
-    async def test_set_version_updates_pragma(self):
+    async def test_set_version_updates_pragma(self, conn):
         """Setting version updates the user_version pragma."""
-        conn = await aiosqlite.connect(":memory:")
-        try:
-            await set_version(conn, 5)
-            version = await get_version(conn)
-            assert version == 5
-        finally:
-            await conn.close()
+        await set_version(conn, 5)
+        version = await get_version(conn)
+        assert version == 5
 
 
 class TestMigration001:
     """Test migration 001: add last_read_at columns."""
 
     @pytest.mark.asyncio
-    async def test_migration_adds_last_read_at_to_contacts(self):
+    async def test_migration_adds_last_read_at_to_contacts(self, conn):
         """Migration adds last_read_at column to contacts table."""
-        conn = await aiosqlite.connect(":memory:")
-        conn.row_factory = aiosqlite.Row
-        try:
-            # Create schema without last_read_at (simulating pre-migration state)
-            await conn.execute("""
-                CREATE TABLE contacts (
-                    public_key TEXT PRIMARY KEY,
-                    name TEXT,
-                    type INTEGER DEFAULT 0,
-                    flags INTEGER DEFAULT 0,
-                    last_path TEXT,
-                    last_path_len INTEGER DEFAULT -1,
-                    last_advert INTEGER,
-                    lat REAL,
-                    lon REAL,
-                    last_seen INTEGER,
-                    on_radio INTEGER DEFAULT 0,
-                    last_contacted INTEGER
-                )
-            """)
-            await conn.execute("""
-                CREATE TABLE channels (
-                    key TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    is_hashtag INTEGER DEFAULT 0,
-                    on_radio INTEGER DEFAULT 0
-                )
-            """)
-            # Raw packets table with old schema (for migrations 2 and 3)
-            await conn.execute("""
-                CREATE TABLE raw_packets (
-                    id INTEGER PRIMARY KEY,
-                    timestamp INTEGER NOT NULL,
-                    data BLOB NOT NULL,
-                    decrypted INTEGER DEFAULT 0,
-                    message_id INTEGER,
-                    decrypt_attempts INTEGER DEFAULT 0,
-                    last_attempt INTEGER
-                )
-            """)
-            await conn.execute("CREATE INDEX idx_raw_packets_decrypted ON raw_packets(decrypted)")
-            # Messages table with old schema (for migrations 6 and 7)
-            await conn.execute("""
-                CREATE TABLE messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,
-                    conversation_key TEXT NOT NULL,
-                    text TEXT NOT NULL,
-                    sender_timestamp INTEGER,
-                    received_at INTEGER NOT NULL,
-                    path_len INTEGER,
-                    txt_type INTEGER DEFAULT 0,
-                    signature TEXT,
-                    outgoing INTEGER DEFAULT 0,
-                    acked INTEGER DEFAULT 0,
-                    UNIQUE(type, conversation_key, text, sender_timestamp)
-                )
-            """)
-            await conn.commit()
-
-            # Run migrations
-            applied = await run_migrations(conn)
-
-            assert applied == 17  # All 17 migrations run
-            assert await get_version(conn) == 17
-
-            # Verify columns exist by inserting and selecting
-            await conn.execute(
-                "INSERT INTO contacts (public_key, name, last_read_at) VALUES (?, ?, ?)",
-                ("abc123", "Test", 12345),
-            )
-            await conn.execute(
-                "INSERT INTO channels (key, name, last_read_at) VALUES (?, ?, ?)",
-                ("KEY123", "#test", 67890),
-            )
-            await conn.commit()
-
-            cursor = await conn.execute(
-                "SELECT last_read_at FROM contacts WHERE public_key = ?", ("abc123",)
-            )
-            row = await cursor.fetchone()
-            assert row["last_read_at"] == 12345
-
-            cursor = await conn.execute(
-                "SELECT last_read_at FROM channels WHERE key = ?", ("KEY123",)
-            )
-            row = await cursor.fetchone()
-            assert row["last_read_at"] == 67890
-        finally:
-            await conn.close()
+        # Create schema without last_read_at (simulating pre-migration state)
+        await conn.executescript(
+            """
+            CREATE TABLE contacts (
+                public_key TEXT PRIMARY KEY,
+                name TEXT,
+                type INTEGER DEFAULT 0,
+                flags INTEGER DEFAULT 0,
+                last_path TEXT,
+                last_path_len INTEGER DEFAULT -1,
+                last_advert INTEGER,
+                lat REAL,
+                lon REAL,
+                last_seen INTEGER,
+                on_radio INTEGER DEFAULT 0,
+                last_contacted INTEGER
+            );
+            CREATE TABLE channels (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                is_hashtag INTEGER DEFAULT 0,
+                on_radio INTEGER DEFAULT 0
+            );
+            """
+            + _LEGACY_PACKETS_AND_MESSAGES_DDL
+        )
+
+        # Run migrations
+        applied = await run_migrations(conn)
+
+        assert applied == 20  # All 20 migrations run
+        assert await get_version(conn) == 20
+        # Every migration committed its own work; nothing is left pending.
+        assert not conn.in_transaction
+
+        # Verify columns exist by inserting and selecting
+        await conn.execute(
+            "INSERT INTO contacts (public_key, name, last_read_at) VALUES (?, ?, ?)",
+            ("abc123", "Test", 12345),
+        )
+        await conn.execute(
+            "INSERT INTO channels (key, name, last_read_at) VALUES (?, ?, ?)",
+            ("KEY123", "#test", 67890),
+        )
+
+        cursor = await conn.execute(
+            "SELECT last_read_at FROM contacts WHERE public_key = ?", ("abc123",)
+        )
+        row = await cursor.fetchone()
+        assert row["last_read_at"] == 12345
+
+        cursor = await conn.execute("SELECT last_read_at FROM channels WHERE key = ?", ("KEY123",))
+        row = await cursor.fetchone()
+        assert row["last_read_at"] == 67890
 
     @pytest.mark.asyncio
-    async def test_migration_is_idempotent(self):
+    async def test_migration_is_idempotent(self, conn):
         """Running migration multiple times is safe."""
-        conn = await aiosqlite.connect(":memory:")
-        conn.row_factory = aiosqlite.Row
-        try:
-            # Create schema without last_read_at
-            await conn.execute("""
-                CREATE TABLE contacts (
-                    public_key TEXT PRIMARY KEY,
-                    name TEXT
-                )
-            """)
-            await conn.execute("""
-                CREATE TABLE channels (
-                    key TEXT PRIMARY KEY,
-                    name TEXT NOT NULL
-                )
-            """)
-            # Raw packets table with old schema (for migrations 2 and 3)
-            await conn.execute("""
-                CREATE TABLE raw_packets (
-                    id INTEGER PRIMARY KEY,
-                    timestamp INTEGER NOT NULL,
-                    data BLOB NOT NULL,
-                    decrypted INTEGER DEFAULT 0,
-                    message_id INTEGER,
-                    decrypt_attempts INTEGER DEFAULT 0,
-                    last_attempt INTEGER
-                )
-            """)
-            await conn.execute("CREATE INDEX idx_raw_packets_decrypted ON raw_packets(decrypted)")
-            # Messages table with old schema (for migrations 6 and 7)
-            await conn.execute("""
-                CREATE TABLE messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,
-                    conversation_key TEXT NOT NULL,
-                    text TEXT NOT NULL,
-                    sender_timestamp INTEGER,
-                    received_at INTEGER NOT NULL,
-                    path_len INTEGER,
-                    txt_type INTEGER DEFAULT 0,
-                    signature TEXT,
-                    outgoing INTEGER DEFAULT 0,
-                    acked INTEGER DEFAULT 0,
-                    UNIQUE(type, conversation_key, text, sender_timestamp)
-                )
-            """)
-            await conn.commit()
-
-            # Run migrations twice
-            applied1 = await run_migrations(conn)
-            applied2 = await run_migrations(conn)
-
-            assert applied1 == 17  # All 17 migrations run
-            assert applied2 == 0  # No migrations on second run
-            assert await get_version(conn) == 17
-        finally:
-            await conn.close()
+        # Create schema without last_read_at
+        await conn.executescript(
+            """
+            CREATE TABLE contacts (
+                public_key TEXT PRIMARY KEY,
+                name TEXT
+            );
+            CREATE TABLE channels (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL
+            );
+            """
+            + _LEGACY_PACKETS_AND_MESSAGES_DDL
+        )
+
+        # Run migrations twice
+        applied1 = await run_migrations(conn)
+        applied2 = await run_migrations(conn)
+
+        assert applied1 == 20  # All 20 migrations run
+        assert applied2 == 0  # No migrations on second run
+        assert await get_version(conn) == 20
 
     @pytest.mark.asyncio
-    async def test_migration_handles_column_already_exists(self):
+    async def test_migration_handles_column_already_exists(self, conn):
         """Migration handles case where column already exists."""
-        conn = await aiosqlite.connect(":memory:")
-        conn.row_factory = aiosqlite.Row
-        try:
-            # Create schema with last_read_at already present
-            await conn.execute("""
-                CREATE TABLE contacts (
-                    public_key TEXT PRIMARY KEY,
-                    name TEXT,
-                    last_read_at INTEGER
-                )
-            """)
-            await conn.execute("""
-                CREATE TABLE channels (
-                    key TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    last_read_at INTEGER
-                )
-            """)
-            # Raw packets table with old schema (for migrations 2 and 3)
-            await conn.execute("""
-                CREATE TABLE raw_packets (
-                    id INTEGER PRIMARY KEY,
-                    timestamp INTEGER NOT NULL,
-                    data BLOB NOT NULL,
-                    decrypted INTEGER DEFAULT 0,
-                    message_id INTEGER,
-                    decrypt_attempts INTEGER DEFAULT 0,
-                    last_attempt INTEGER
-                )
-            """)
-            await conn.execute("CREATE INDEX idx_raw_packets_decrypted ON raw_packets(decrypted)")
-            # Messages table with old schema (for migrations 6 and 7)
-            await conn.execute("""
-                CREATE TABLE messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,
-                    conversation_key TEXT NOT NULL,
-                    text TEXT NOT NULL,
-                    sender_timestamp INTEGER,
-                    received_at INTEGER NOT NULL,
-                    path_len INTEGER,
-                    txt_type INTEGER DEFAULT 0,
-                    signature TEXT,
-                    outgoing INTEGER DEFAULT 0,
-                    acked INTEGER DEFAULT 0,
-                    UNIQUE(type, conversation_key, text, sender_timestamp)
-                )
-            """)
-            await conn.commit()
-
-            # Run migrations - should not fail
-            applied = await run_migrations(conn)
-
-            # All 17 migrations applied (version incremented) but no error
-            assert applied == 17
-            assert await get_version(conn) == 17
-        finally:
-            await conn.close()
+        # Create schema with last_read_at already present
+        await conn.executescript(
+            """
+            CREATE TABLE contacts (
+                public_key TEXT PRIMARY KEY,
+                name TEXT,
+                last_read_at INTEGER
+            );
+            CREATE TABLE channels (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                last_read_at INTEGER
+            );
+            """
+            + _LEGACY_PACKETS_AND_MESSAGES_DDL
+        )
+
+        # Run migrations - should not fail
+        applied = await run_migrations(conn)
+
+        # All 20 migrations applied (version incremented) but no error
+        assert applied == 20
+        assert await get_version(conn) == 20
 
     @pytest.mark.asyncio
-    async def test_existing_data_preserved_after_migration(self):
+    async def test_existing_data_preserved_after_migration(self, conn):
         """Migration preserves existing contact and channel data."""
-        conn = await aiosqlite.connect(":memory:")
-        conn.row_factory = aiosqlite.Row
-        try:
-            # Create schema and insert data before migration
-            await conn.execute("""
-                CREATE TABLE contacts (
-                    public_key TEXT PRIMARY KEY,
-                    name TEXT,
-                    type INTEGER DEFAULT 0
-                )
-            """)
-            await conn.execute("""
-                CREATE TABLE channels (
-                    key TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    is_hashtag INTEGER DEFAULT 0
-                )
-            """)
-            # Raw packets table with old schema (for migrations 2 and 3)
-            await conn.execute("""
-                CREATE TABLE raw_packets (
-                    id INTEGER PRIMARY KEY,
-                    timestamp INTEGER NOT NULL,
-                    data BLOB NOT NULL,
-                    decrypted INTEGER DEFAULT 0,
-                    message_id INTEGER,
-                    decrypt_attempts INTEGER DEFAULT 0,
-                    last_attempt INTEGER
-                )
-            """)
-            await conn.execute("CREATE INDEX idx_raw_packets_decrypted ON raw_packets(decrypted)")
-            # Messages table with old schema (for migrations 6 and 7)
-            await conn.execute("""
-                CREATE TABLE messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,
-                    conversation_key TEXT NOT NULL,
-                    text TEXT NOT NULL,
-                    sender_timestamp INTEGER,
-                    received_at INTEGER NOT NULL,
-                    path_len INTEGER,
-                    txt_type INTEGER DEFAULT 0,
-                    signature TEXT,
-                    outgoing INTEGER DEFAULT 0,
-                    acked INTEGER DEFAULT 0,
-                    UNIQUE(type, conversation_key, text, sender_timestamp)
-                )
-            """)
-            await conn.execute(
-                "INSERT INTO contacts (public_key, name, type) VALUES (?, ?, ?)",
-                ("existingkey", "ExistingContact", 1),
-            )
-            await conn.execute(
-                "INSERT INTO channels (key, name, is_hashtag) VALUES (?, ?, ?)",
-                ("EXISTINGCHAN", "#existing", 1),
-            )
-            await conn.commit()
-
-            # Run migrations
-            await run_migrations(conn)
-
-            # Verify data is preserved
-            cursor = await conn.execute(
-                "SELECT public_key, name, type, last_read_at FROM contacts WHERE public_key = ?",
-                ("existingkey",),
-            )
-            row = await cursor.fetchone()
-            assert row["public_key"] == "existingkey"
-            assert row["name"] == "ExistingContact"
-            assert row["type"] == 1
-            assert row["last_read_at"] is None  # New column defaults to NULL
-
-            cursor = await conn.execute(
-                "SELECT key, name, is_hashtag, last_read_at FROM channels WHERE key = ?",
-                ("EXISTINGCHAN",),
-            )
-            row = await cursor.fetchone()
-            assert row["key"] == "EXISTINGCHAN"
-            assert row["name"] == "#existing"
-            assert row["is_hashtag"] == 1
-            assert row["last_read_at"] is None
-        finally:
-            await conn.close()
+        # Create schema and insert data before migration
+        await conn.executescript(
+            """
+            CREATE TABLE contacts (
+                public_key TEXT PRIMARY KEY,
+                name TEXT,
+                type INTEGER DEFAULT 0
+            );
+            CREATE TABLE channels (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                is_hashtag INTEGER DEFAULT 0
+            );
+            """
+            + _LEGACY_PACKETS_AND_MESSAGES_DDL
+        )
+        await conn.execute(
+            "INSERT INTO contacts (public_key, name, type) VALUES (?, ?, ?)",
+            ("existingkey", "ExistingContact", 1),
+        )
+        await conn.execute(
+            "INSERT INTO channels (key, name, is_hashtag) VALUES (?, ?, ?)",
+            ("EXISTINGCHAN", "#existing", 1),
+        )
+        await conn.commit()
+
+        # Run migrations
+        await run_migrations(conn)
+
+        # Verify data is preserved
+        cursor = await conn.execute(
+            "SELECT public_key, name, type, last_read_at FROM contacts WHERE public_key = ?",
+            ("existingkey",),
+        )
+        row = await cursor.fetchone()
+        assert row["public_key"] == "existingkey"
+        assert row["name"] == "ExistingContact"
+        assert row["type"] == 1
+        assert row["last_read_at"] is None  # New column defaults to NULL
+
+        cursor = await conn.execute(
+            "SELECT key, name, is_hashtag, last_read_at FROM channels WHERE key = ?",
+            ("EXISTINGCHAN",),
+        )
+        row = await cursor.fetchone()
+        assert row["key"] == "EXISTINGCHAN"
+        assert row["name"] == "#existing"
+        assert row["is_hashtag"] == 1
+        assert row["last_read_at"] is None
 
 
 class TestMigration013:
     """Test migration 013: convert bot_enabled/bot_code to multi-bot format."""
 
     @pytest.mark.asyncio
-    async def test_migration_converts_existing_bot_to_array(self):
+    async def test_migration_converts_existing_bot_to_array(self, conn):
         """Migration converts existing bot_enabled/bot_code to bots array."""
         import json
 
-        conn = await aiosqlite.connect(":memory:")
-        conn.row_factory = aiosqlite.Row
-        try:
-            # Set version to 12 (just before migration 13)
-            await set_version(conn, 12)
-
-            # Create app_settings with old bot columns
-            await conn.execute("""
-                CREATE TABLE app_settings (
-                    id INTEGER PRIMARY KEY,
-                    max_radio_contacts INTEGER DEFAULT 50,
-                    favorites TEXT DEFAULT '[]',
-                    auto_decrypt_dm_on_advert INTEGER DEFAULT 0,
-                    sidebar_sort_order TEXT DEFAULT 'recent',
-                    last_message_times TEXT DEFAULT '{}',
-                    preferences_migrated INTEGER DEFAULT 0,
-                    advert_interval INTEGER DEFAULT 0,
-                    last_advert_time INTEGER DEFAULT 0,
-                    bot_enabled INTEGER DEFAULT 0,
-                    bot_code TEXT DEFAULT ''
-                )
-            """)
-            await conn.execute(
-                "INSERT INTO app_settings (id, bot_enabled, bot_code) VALUES (1, 1, 'def bot(): return \"hello\"')"
+        # Set version to 12 (just before migration 13)
+        await set_version(conn, 12)
+
+        # Create app_settings with old bot columns
+        await conn.execute("""
+            CREATE TABLE app_settings (
+                id INTEGER PRIMARY KEY,
+                max_radio_contacts INTEGER DEFAULT 50,
+                favorites TEXT DEFAULT '[]',
+                auto_decrypt_dm_on_advert INTEGER DEFAULT 0,
+                sidebar_sort_order TEXT DEFAULT 'recent',
+                last_message_times TEXT DEFAULT '{}',
+                preferences_migrated INTEGER DEFAULT 0,
+                advert_interval INTEGER DEFAULT 0,
+                last_advert_time INTEGER DEFAULT 0,
+                bot_enabled INTEGER DEFAULT 0,
+                bot_code TEXT DEFAULT ''
             )
-            await conn.commit()
-
-            # Run migration 13 (plus 14+15+16+17 which also run)
-            applied = await run_migrations(conn)
-            assert applied == 5
-            assert await get_version(conn) == 17
-
-            # Verify bots array was created with migrated data
-            cursor = await conn.execute("SELECT bots FROM app_settings WHERE id = 1")
-            row = await cursor.fetchone()
-            bots = json.loads(row["bots"])
-
-            assert len(bots) == 1
-            assert bots[0]["name"] == "Bot 1"
-            assert bots[0]["enabled"] is True
-            assert bots[0]["code"] == 'def bot(): return "hello"'
-            assert "id" in bots[0]  # Should have a UUID
-        finally:
-            await conn.close()
+        """)
+        await conn.execute(
+            "INSERT INTO app_settings (id, bot_enabled, bot_code) VALUES (1, 1, 'def bot(): return \"hello\"')"
+        )
+        await conn.commit()
+
+        # Run migration 13 (plus 14 through 20 which also run)
+        applied = await run_migrations(conn)
+        assert applied == 8
+        assert await get_version(conn) == 20
+
+        # Verify bots array was created with migrated data
+        cursor = await conn.execute("SELECT bots FROM app_settings WHERE id = 1")
+        row = await cursor.fetchone()
+        bots = json.loads(row["bots"])
+
+        assert len(bots) == 1
+        assert bots[0]["name"] == "Bot 1"
+        assert bots[0]["enabled"] is True
+        assert bots[0]["code"] == 'def bot(): return "hello"'
+        assert "id" in bots[0]  # Should have a UUID
 
     @pytest.mark.asyncio
-    async def test_migration_creates_empty_array_when_no_bot(self):
+    async def test_migration_creates_empty_array_when_no_bot(self, conn):
         """Migration creates empty bots array when no existing bot data."""
         import json
 
-        conn = await aiosqlite.connect(":memory:")
-        conn.row_factory = aiosqlite.Row
-        try:
-            await set_version(conn, 12)
-
-            await conn.execute("""
-                CREATE TABLE app_settings (
-                    id INTEGER PRIMARY KEY,
-                    max_radio_contacts INTEGER DEFAULT 50,
-                    favorites TEXT DEFAULT '[]',
-                    auto_decrypt_dm_on_advert INTEGER DEFAULT 0,
-                    sidebar_sort_order TEXT DEFAULT 'recent',
-                    last_message_times TEXT DEFAULT '{}',
-                    preferences_migrated INTEGER DEFAULT 0,
-                    advert_interval INTEGER DEFAULT 0,
-                    last_advert_time INTEGER DEFAULT 0,
-                    bot_enabled INTEGER DEFAULT 0,
-                    bot_code TEXT DEFAULT ''
-                )
-            """)
-            await conn.execute(
-                "INSERT INTO app_settings (id, bot_enabled, bot_code) VALUES (1, 0, '')"
+        await set_version(conn, 12)
+
+        await conn.execute("""
+            CREATE TABLE app_settings (
+                id INTEGER PRIMARY KEY,
+                max_radio_contacts INTEGER DEFAULT 50,
+                favorites TEXT DEFAULT '[]',
+                auto_decrypt_dm_on_advert INTEGER DEFAULT 0,
+                sidebar_sort_order TEXT DEFAULT 'recent',
+                last_message_times TEXT DEFAULT '{}',
+                preferences_migrated INTEGER DEFAULT 0,
+                advert_interval INTEGER DEFAULT 0,
+                last_advert_time INTEGER DEFAULT 0,
+                bot_enabled INTEGER DEFAULT 0,
+                bot_code TEXT DEFAULT ''
             )
-            await conn.commit()
+        """)
+        await conn.execute("INSERT INTO app_settings (id, bot_enabled, bot_code) VALUES (1, 0, '')")
+        await conn.commit()
+
+        await run_migrations(conn)
 
-            await run_migrations(conn)
+        cursor = await conn.execute("SELECT bots FROM app_settings WHERE id = 1")
+        row = await cursor.fetchone()
+        bots = json.loads(row["bots"])
 
-            cursor = await conn.execute("SELECT bots FROM app_settings WHERE id = 1")
-            row = await cursor.fetchone()
-            bots = json.loads(row["bots"])
+        assert bots == []
 
-            assert bots == []
-        finally:
-            await conn.close()
+
+class TestMigration018:
+    """Test migration 018: rehash payload_hash as a 16-byte BLAKE2b BLOB."""
+
+    @pytest.mark.asyncio
+    async def test_migration_rehashes_hex_payload_hashes(self, conn):
+        """SHA-256 hex hashes are replaced with BLAKE2b-128 digests of the same payload."""
+        from hashlib import blake2b, sha256
+
+        # FLOOD route (header 0x01), empty path, payload b"hello"
+        packet = b"\x01\x00hello"
+        malformed = b"\x01"
+
+        await set_version(conn, 17)
+        await conn.executescript("""
+            CREATE TABLE raw_packets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                message_id INTEGER,
+                payload_hash TEXT
+            );
+            CREATE UNIQUE INDEX idx_raw_packets_payload_hash ON raw_packets(payload_hash);
+        """)
+        await conn.executemany(
+            "INSERT INTO raw_packets (timestamp, data, payload_hash) VALUES (?, ?, ?)",
+            [
+                (1, packet, sha256(b"hello").hexdigest()),
+                (2, malformed, sha256(malformed).hexdigest()),
+            ],
+        )
+        await conn.commit()
+
+        applied = await run_migrations(conn)
+
+        assert applied == 3
+        assert await get_version(conn) == 20
+        cursor = await conn.execute("SELECT payload_hash FROM raw_packets ORDER BY id")
+        hashes = [row[0] for row in await cursor.fetchall()]
+        assert hashes == [
+            blake2b(b"hello", digest_size=16).digest(),
+            blake2b(malformed, digest_size=16).digest(),
+        ]
+
+
+class TestMigration019:
+    """Test migration 019: covering index for unread counts."""
+
+    @pytest.mark.asyncio
+    async def test_migration_replaces_conversation_index(self, conn):
+        """The four-column unread index is created and the old prefix index dropped."""
+        await set_version(conn, 18)
+        await conn.executescript("""
+            CREATE TABLE messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                conversation_key TEXT NOT NULL,
+                text TEXT NOT NULL,
+                received_at INTEGER NOT NULL,
+                outgoing INTEGER DEFAULT 0
+            );
+            CREATE INDEX idx_messages_conversation ON messages(type, conversation_key);
+        """)
+
+        applied = await run_migrations(conn)
+
+        assert applied == 2
+        assert await get_version(conn) == 20
+        cursor = await conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='messages'"
+        )
+        names = {row["name"] for row in await cursor.fetchall()}
+        assert "idx_messages_unread" in names
+        assert "idx_messages_conversation" not in names
+
+
+class TestMigration020:
+    """Test migration 020: partial index over undecrypted raw packets."""
+
+    @pytest.mark.asyncio
+    async def test_prune_query_uses_partial_index(self, conn):
+        """The undecrypted-packet DELETE is planned against the partial index."""
+        await set_version(conn, 19)
+        await conn.execute("""
+            CREATE TABLE raw_packets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                message_id INTEGER,
+                payload_hash BLOB
+            )
+        """)
+
+        applied = await run_migrations(conn)
+
+        assert applied == 1
+        assert await get_version(conn) == 20
+        cursor = await conn.execute(
+            "EXPLAIN QUERY PLAN DELETE FROM raw_packets WHERE message_id IS NULL AND timestamp < ?",
+            (0,),
+        )
+        plan = " ".join(row["detail"] for row in await cursor.fetchall())
+        assert "idx_raw_packets_undecrypted" in plan
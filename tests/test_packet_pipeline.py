@@ -13,7 +13,6 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.database import Database
 from app.decoder import DecryptedDirectMessage, PacketInfo, PayloadType
 from app.repository import (
     ChannelRepository,
@@ -28,29 +27,6 @@ with open(FIXTURES_PATH) as f:
     FIXTURES = json.load(f)
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database.
-
-    We need to patch the db module-level variable before any repository
-    methods are called, so they use our test database.
-    """
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    # Store original and patch the module attribute directly
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 @pytest.fixture
 def captured_broadcasts():
     """Capture WebSocket broadcasts for verification."""
@@ -497,21 +473,17 @@ class TestCreateMessageFromDecrypted:
     """Test the shared message creation function used by both real-time and historical decryption."""
 
     @pytest.mark.asyncio
-    async def test_schedules_bot_in_background(self, test_db, captured_broadcasts):
+    async def test_schedules_bot_in_background(self, test_db, captured_broadcasts, capture_task):
         """Bot execution is scheduled and does not block channel message persistence."""
         from app.packet_processor import create_message_from_decrypted
 
         packet_id, _ = await RawPacketRepository.create(b"test_packet_bot_channel", 1700000000)
         broadcasts, mock_broadcast = captured_broadcasts
 
-        def _capture_task(coro):
-            coro.close()
-            return MagicMock()
-
         with (
             patch("app.packet_processor.broadcast_event", mock_broadcast),
             patch(
-                "app.packet_processor.asyncio.create_task", side_effect=_capture_task
+                "app.packet_processor.asyncio.create_task", side_effect=capture_task
             ) as mock_task,
             patch("app.bot.run_bot_for_message", new_callable=AsyncMock) as mock_bot,
         ):
@@ -748,7 +720,7 @@ class TestCreateDMMessageFromDecrypted:
     A1B2C3_PUB = "a1b2c3d3ba9f5fa8705b9845fe11cc6f01d1d49caaf4d122ac7121663c5beec7"
 
     @pytest.mark.asyncio
-    async def test_schedules_bot_in_background(self, test_db, captured_broadcasts):
+    async def test_schedules_bot_in_background(self, test_db, captured_broadcasts, capture_task):
         """Bot execution is scheduled and does not block DM persistence."""
         from app.decoder import DecryptedDirectMessage
         from app.packet_processor import create_dm_message_from_decrypted
@@ -763,14 +735,10 @@ class TestCreateDMMessageFromDecrypted:
         )
         broadcasts, mock_broadcast = captured_broadcasts
 
-        def _capture_task(coro):
-            coro.close()
-            return MagicMock()
-
         with (
             patch("app.packet_processor.broadcast_event", mock_broadcast),
             patch(
-                "app.packet_processor.asyncio.create_task", side_effect=_capture_task
+                "app.packet_processor.asyncio.create_task", side_effect=capture_task
             ) as mock_task,
             patch("app.bot.run_bot_for_message", new_callable=AsyncMock) as mock_bot,
         ):
@@ -1213,6 +1181,9 @@ class TestProcessDirectMessageDispatch:
     CONTACT_PUB_HEX = "a1b2c3d3ba9f5fa8705b9845fe11cc6f01d1d49caaf4d122ac7121663c5beec7"
     CONTACT_PUB = bytes.fromhex(CONTACT_PUB_HEX)
 
+    # Raw packet handed to _process_direct_message; decryption is mocked, so its body is zeros
+    RAW_DM_PACKET = b"\x09\x00" + bytes(30)
+
     def _make_packet_info(
         self, dest_byte: int, src_byte: int, payload_extra: bytes = b"\x00" * 32
     ) -> PacketInfo:
@@ -1255,7 +1226,7 @@ class TestProcessDirectMessageDispatch:
 
         packet_info = self._make_packet_info(0xFA, 0xA1)
         with self._keystore_patches(has_key=False):
-            result = await _process_direct_message(b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info)
+            result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
         assert result is None
 
     @pytest.mark.asyncio
@@ -1293,7 +1264,7 @@ class TestProcessDirectMessageDispatch:
         # Our first byte is 0xFA; use 0xBB and 0xCC instead
         packet_info = self._make_packet_info(0xBB, 0xCC)
         with self._keystore_patches(has_key=True):
-            result = await _process_direct_message(b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info)
+            result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
         assert result is None
 
     @pytest.mark.asyncio
@@ -1320,9 +1291,7 @@ class TestProcessDirectMessageDispatch:
                 "app.packet_processor.try_decrypt_dm", return_value=mock_decrypted
             ) as mock_try:
                 with patch("app.packet_processor.broadcast_event", mock_broadcast):
-                    result = await _process_direct_message(
-                        b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info
-                    )
+                    result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
 
         assert result is not None
         assert result["decrypted"] is True
@@ -1356,9 +1325,7 @@ class TestProcessDirectMessageDispatch:
                 "app.packet_processor.try_decrypt_dm", return_value=mock_decrypted
             ) as mock_try:
                 with patch("app.packet_processor.broadcast_event", mock_broadcast):
-                    result = await _process_direct_message(
-                        b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info
-                    )
+                    result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
 
         assert result is not None
         assert result["decrypted"] is True
@@ -1393,9 +1360,7 @@ class TestProcessDirectMessageDispatch:
                 "app.packet_processor.try_decrypt_dm", return_value=mock_decrypted
             ) as mock_try:
                 with patch("app.packet_processor.broadcast_event", mock_broadcast):
-                    result = await _process_direct_message(
-                        b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info
-                    )
+                    result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
 
         assert result is not None
         # For incoming, try_decrypt_dm should be called with our_public_key set
@@ -1415,7 +1380,7 @@ class TestProcessDirectMessageDispatch:
 
         # Don't create any contacts -> no candidates
         with self._keystore_patches(has_key=True):
-            result = await _process_direct_message(b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info)
+            result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
         assert result is None
 
     @pytest.mark.asyncio
@@ -1431,9 +1396,7 @@ class TestProcessDirectMessageDispatch:
 
         with self._keystore_patches(has_key=True):
             with patch("app.packet_processor.try_decrypt_dm", return_value=None):
-                result = await _process_direct_message(
-                    b"\x09\x00" + b"\x00" * 30, 1, 1000, packet_info
-                )
+                result = await _process_direct_message(self.RAW_DM_PACKET, 1, 1000, packet_info)
         assert result is None
 
     @pytest.mark.asyncio
@@ -1443,7 +1406,7 @@ class TestProcessDirectMessageDispatch:
         from app.packet_processor import _process_direct_message
 
         # First, create a raw packet so create_dm_message_from_decrypted can link it
-        packet_id, _ = await RawPacketRepository.create(b"\x09\x00" + b"\x00" * 30, 1000)
+        packet_id, _ = await RawPacketRepository.create(self.RAW_DM_PACKET, 1000)
 
         packet_info = self._make_packet_info(0xFA, 0xA1)
 
@@ -1460,7 +1423,7 @@ class TestProcessDirectMessageDispatch:
             with patch("app.packet_processor.try_decrypt_dm", return_value=mock_decrypted):
                 with patch("app.packet_processor.broadcast_event", mock_broadcast):
                     result = await _process_direct_message(
-                        b"\x09\x00" + b"\x00" * 30, packet_id, 1000, packet_info
+                        self.RAW_DM_PACKET, packet_id, 1000, packet_info
                     )
 
         assert result is not None
@@ -9,7 +9,6 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from meshcore import EventType
 
-from app.database import Database
 from app.models import Favorite
 from app.radio_sync import (
     is_polling_paused,
@@ -25,24 +24,6 @@ from app.repository import (
 )
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database with schema + migrations."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 @pytest.fixture(autouse=True)
 def reset_sync_state():
     """Reset polling pause state and sync timestamp before and after each test."""
@@ -6,7 +6,6 @@ import pytest
 from fastapi import HTTPException
 from meshcore import EventType
 
-from app.database import Database
 from app.models import CommandRequest, TelemetryRequest
 from app.repository import ContactRepository
 from app.routers.contacts import request_telemetry, request_trace, send_repeater_command
@@ -14,24 +13,6 @@ from app.routers.contacts import request_telemetry, request_trace, send_repeater
 KEY_A = "aa" * 32
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database with schema + migrations."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 def _radio_result(event_type=EventType.OK, payload=None):
     result = MagicMock()
     result.type = event_type
@@ -5,28 +5,10 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.database import Database
+from app.database import Database, db
 from app.repository import MessageRepository
 
 
-@pytest.fixture
-async def test_db():
-    """Create an in-memory test database with the module-level db swapped in."""
-    import app.repository as repo_module
-
-    db = Database(":memory:")
-    await db.connect()
-
-    original_db = repo_module.db
-    repo_module.db = db
-
-    try:
-        yield db
-    finally:
-        repo_module.db = original_db
-        await db.disconnect()
-
-
 async def _create_message(test_db, **overrides) -> int:
     """Helper to insert a message and return its id."""
     defaults = {
@@ -492,3 +474,39 @@ class TestMessageRepositoryGetById:
         result = await MessageRepository.get_by_id(999999)
 
         assert result is None
+
+
+class TestConnectionOverride:
+    """Test routing Database.conn through a context-local override."""
+
+    @pytest.mark.asyncio
+    async def test_override_routes_conn_and_restores_on_exit(self, fresh_db, clone_template_db):
+        """conn returns the override inside the block and its own connection after."""
+        other = await clone_template_db()
+        try:
+            with fresh_db.override_connection(other.conn):
+                assert fresh_db.conn is other.conn
+            assert fresh_db.conn is not other.conn
+        finally:
+            await other.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_override_is_scoped_to_one_instance(self, fresh_db, clone_template_db):
+        """Overriding one Database leaves every other instance on its own connection."""
+        other = await clone_template_db()
+        try:
+            with db.override_connection(fresh_db.conn):
+                assert db.conn is fresh_db.conn
+                assert other.conn is other._connection
+        finally:
+            await other.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_override_works_without_own_connection(self, fresh_db):
+        """An unconnected Database serves queries from the override connection."""
+        unconnected = Database(":memory:")
+        with unconnected.override_connection(fresh_db.conn):
+            cursor = await unconnected.conn.execute("SELECT COUNT(*) FROM messages")
+            assert (await cursor.fetchone())[0] == 0
+        with pytest.raises(RuntimeError):
+            unconnected.conn  # noqa: B018
@@ -5,7 +5,8 @@ from unittest.mock import AsyncMock
 
 import pytest
 
-from app.websocket import SEND_TIMEOUT_SECONDS, WebSocketManager
+import app.websocket as websocket_module
+from app.websocket import SEND_TIMEOUT_SECONDS, WebSocketManager, broadcast_event
 
 
 @pytest.fixture
@@ -203,3 +204,30 @@ class TestWebSocketConnectionManagement:
         # Should not raise
         await ws_manager.disconnect(mock_websocket)
         assert len(ws_manager.active_connections) == 0
+
+
+class TestBroadcastEvent:
+    """Tests for the fire-and-forget broadcast_event helper."""
+
+    def test_no_task_without_clients(self, monkeypatch, ws_manager: WebSocketManager):
+        """With nobody connected, broadcast_event schedules nothing."""
+        scheduled = []
+        monkeypatch.setattr(websocket_module, "ws_manager", ws_manager)
+        monkeypatch.setattr(websocket_module.asyncio, "create_task", scheduled.append)
+
+        broadcast_event("raw_packet", {"id": 1})
+
+        assert scheduled == []
+
+    @pytest.mark.asyncio
+    async def test_sends_to_connected_client(
+        self, monkeypatch, ws_manager: WebSocketManager, mock_websocket
+    ):
+        """A connected client still receives the event."""
+        await ws_manager.connect(mock_websocket)
+        monkeypatch.setattr(websocket_module, "ws_manager", ws_manager)
+
+        broadcast_event("raw_packet", {"id": 1})
+        await asyncio.sleep(0.01)
+
+        mock_websocket.send_text.assert_called_once()
@@ -12,7 +12,6 @@ radio_manager and health data dependencies.
 from unittest.mock import AsyncMock, patch
 
 import pytest
-from fastapi.testclient import TestClient
 
 from app.websocket import ws_manager
 
@@ -28,7 +27,7 @@ def _clean_ws_manager():
 class TestWebSocketEndpoint:
     """Tests for the /api/ws WebSocket endpoint."""
 
-    def test_receives_initial_health_on_connect(self):
+    def test_receives_initial_health_on_connect(self, sync_client):
         """Client receives a health event with radio status immediately after connecting."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -44,11 +43,7 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 data = ws.receive_json()
 
                 assert data["type"] == "health"
@@ -61,7 +56,7 @@ class TestWebSocketEndpoint:
                 assert "database_size_mb" in health
                 assert "oldest_undecrypted_timestamp" in health
 
-    def test_initial_health_reflects_disconnected_radio(self):
+    def test_initial_health_reflects_disconnected_radio(self, sync_client):
         """Health event reflects degraded status when radio is not connected."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -77,11 +72,7 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 data = ws.receive_json()
 
                 assert data["type"] == "health"
@@ -90,7 +81,7 @@ class TestWebSocketEndpoint:
                 assert health["connection_info"] is None
                 assert health["status"] == "degraded"
 
-    def test_ping_returns_pong(self):
+    def test_ping_returns_pong(self, sync_client):
         """Sending 'ping' text receives a JSON pong response."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -106,11 +97,7 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 # Consume the initial health message
                 ws.receive_json()
 
@@ -120,7 +107,7 @@ class TestWebSocketEndpoint:
 
                 assert pong == {"type": "pong"}
 
-    def test_multiple_pings_return_multiple_pongs(self):
+    def test_multiple_pings_return_multiple_pongs(self, sync_client):
         """Each ping gets its own pong response."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -136,11 +123,7 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 ws.receive_json()  # consume health
 
                 for _ in range(3):
@@ -148,7 +131,7 @@ class TestWebSocketEndpoint:
                     pong = ws.receive_json()
                     assert pong == {"type": "pong"}
 
-    def test_non_ping_message_does_not_produce_response(self):
+    def test_non_ping_message_does_not_produce_response(self, sync_client):
         """Messages other than 'ping' are silently ignored (no response sent)."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -164,11 +147,7 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 ws.receive_json()  # consume health
 
                 # Send a non-ping message, then a ping to verify the connection
@@ -178,7 +157,7 @@ class TestWebSocketEndpoint:
                 pong = ws.receive_json()
                 assert pong == {"type": "pong"}
 
-    def test_disconnect_removes_client_from_manager(self):
+    def test_disconnect_removes_client_from_manager(self, sync_client):
         """Closing the WebSocket removes the connection from ws_manager."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -194,18 +173,14 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 ws.receive_json()  # consume health
                 assert len(ws_manager.active_connections) == 1
 
             # After context manager exits, the WebSocket is closed
             assert len(ws_manager.active_connections) == 0
 
-    def test_disconnect_is_clean_no_error(self):
+    def test_disconnect_is_clean_no_error(self, sync_client):
         """Normal client disconnect does not raise or leave dangling state."""
         with (
             patch("app.routers.ws.radio_manager") as mock_ws_rm,
@@ -221,12 +196,8 @@ class TestWebSocketEndpoint:
             mock_repo.get_oldest_undecrypted = AsyncMock(return_value=None)
             mock_settings.database_path = "/tmp/test.db"
 
-            from app.main import app
-
-            client = TestClient(app)
-
             # Connect and immediately disconnect -- should not raise
-            with client.websocket_connect("/api/ws") as ws:
+            with sync_client.websocket_connect("/api/ws") as ws:
                 ws.receive_json()  # consume health
 
             # Verify clean state